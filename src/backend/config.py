@@ -2,8 +2,12 @@
 Configuration and logging setup for MTL Finder backend
 """
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+from functools import cached_property, lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -38,9 +42,22 @@ class Settings(BaseSettings):
 
     # Logging Configuration
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
+    log_buffer_size: int = Field(default=1, alias="LOG_BUFFER_SIZE")  # records
+
+    # Session Storage Configuration (in-memory when REDIS_URL is not set)
+    redis_url: Optional[str] = Field(default=None, alias="REDIS_URL")
+    session_ttl: int = Field(default=3600, alias="SESSION_TTL")  # seconds
+    max_sessions: int = Field(default=10_000, alias="MAX_SESSIONS")  # in-memory only
+    max_session_messages: int = Field(default=200, alias="MAX_SESSION_MESSAGES")
+
+    # Tool result cache file (SQLite, used when REDIS_URL is not set)
+    tool_cache_path: Optional[str] = Field(default=None, alias="TOOL_CACHE_PATH")
 
     # Chat Configuration
     max_chat_iterations: int = Field(default=10)
+    tool_timeout: float = Field(default=12, alias="TOOL_TIMEOUT")  # seconds per tool call
+    max_history_messages: int = Field(default=40, alias="MAX_HISTORY_MESSAGES")
+    min_history_messages: int = Field(default=20, alias="MIN_HISTORY_MESSAGES")
 
     # CORS Configuration
     cors_origins: str = Field(
@@ -48,9 +65,9 @@ class Settings(BaseSettings):
         alias="CORS_ORIGINS",
     )
 
-    @property
+    @cached_property
     def cors_origins_list(self) -> list[str]:
-        """Parse CORS_ORIGINS string into a list"""
+        """Parse CORS_ORIGINS string into a list (computed once)"""
         return [origin.strip() for origin in self.cors_origins.split(",")]
 
     class Config:
@@ -59,29 +76,30 @@ class Settings(BaseSettings):
         extra = "ignore"  # Ignore extra fields from .env
 
 
-# Global settings instance
-_settings: Optional[Settings] = None
-
-
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     """
-    Get or create settings instance
+    Get or create settings instance (created once, then cached)
 
     Returns:
         Settings: Application settings
     """
-    global _settings
-    if _settings is None:
-        _settings = Settings()
-    return _settings
+    return Settings()
 
 
-def setup_logging(log_level: str = "INFO") -> logging.Logger:
+def setup_logging(log_level: str = "INFO", buffer_size: int = 1) -> logging.Logger:
     """
     Configure logging with specified level using uvicorn's colored formatter
 
+    Log records are handed to a background thread through a queue so that
+    request handlers never block on stdout writes. That thread can buffer up to
+    `buffer_size` records before writing them out, flushing immediately on
+    warnings and errors. Buffering is off by default: a quiet server could
+    otherwise hold INFO records indefinitely.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        buffer_size: Number of records buffered before writing (1 disables buffering)
 
     Returns:
         logging.Logger: Configured logger instance
@@ -102,11 +120,27 @@ def setup_logging(log_level: str = "INFO") -> logging.Logger:
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
 
+    # Optionally coalesce stdout writes, flushing right away on warnings and errors
+    buffered_handler = logging.handlers.MemoryHandler(
+        capacity=buffer_size, flushLevel=logging.WARNING, target=console_handler
+    )
+
+    # Records are only enqueued on the calling thread; formatting and writing
+    # to stdout happen in the listener's background thread
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, buffered_handler, respect_handler_level=True
+    )
+    listener.start()
+    # atexit runs in reverse order: drain the queue first, then flush the buffer
+    atexit.register(buffered_handler.close)
+    atexit.register(listener.stop)
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
     root_logger.handlers.clear()  # Clear existing handlers
-    root_logger.addHandler(console_handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     # Configure uvicorn loggers to use same level
     logging.getLogger("uvicorn").setLevel(level)
@@ -115,7 +149,7 @@ def setup_logging(log_level: str = "INFO") -> logging.Logger:
 
     # Create logger for this module
     logger = logging.getLogger(__name__)
-    logger.info(f"✅ Logging configured with level: {log_level}")
+    logger.info("✅ Logging configured with level: %s", log_level)
 
     return logger
 
@@ -1,23 +1,53 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-import uuid
+from fastapi.responses import StreamingResponse
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, List, Union
 
+import orjson
 from mistralai import Mistral
+from pydantic import BaseModel
 
 from config import get_settings, setup_logging, get_logger
-from models import Message, ChatResponse
-from services.session import SessionStore
+from models import Message, ChatResponse, ChatTurnResponse
+from services.session import SessionStore, RedisSessionStore, CachedSessionStore
 from services.chat import ChatService
+from services.ids import new_session_id
+from tools import run_alerts_refresh, warm_up_connections
 
 # Initialize settings and logging
 settings = get_settings()
-setup_logging(settings.log_level)
+setup_logging(settings.log_level, settings.log_buffer_size)
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up the tool connections and start the STM alerts refresh on startup,
+    release the session store connections and tool threads on shutdown
+    """
+    stop_refresh = threading.Event()
+    if chat_service:
+        # Handshakes happen in the background so startup isn't delayed
+        threading.Thread(target=warm_up_connections, name="http-warmup", daemon=True).start()
+        threading.Thread(
+            target=run_alerts_refresh, args=(stop_refresh,), name="stm-refresh", daemon=True
+        ).start()
+    yield
+    stop_refresh.set()
+    if chat_service:
+        chat_service.close()
+    await session_store.close()
+    logger.info("👋 Session store closed")
+
+
 # Initialize FastAPI app
-app = FastAPI(title="MTL Finder Chat API")
+app = FastAPI(title="MTL Finder Chat API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -26,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "DELETE"],
     allow_headers=["Content-Type"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
 # Initialize Mistral client
@@ -35,8 +66,23 @@ if not settings.mistral_api_key:
 else:
     mistral_client = Mistral(api_key=settings.mistral_api_key)
 
-# Initialize session store (singleton)
-session_store = SessionStore()
+# Initialize session store (singleton), shared through Redis when configured
+session_store: Union[SessionStore, CachedSessionStore]
+if settings.redis_url:
+    logger.info("🗄️  Using Redis session store")
+    session_store = CachedSessionStore(
+        RedisSessionStore(
+            settings.redis_url,
+            ttl=settings.session_ttl,
+            max_messages=settings.max_session_messages,
+        )
+    )
+else:
+    session_store = SessionStore(
+        maxsize=settings.max_sessions,
+        ttl=settings.session_ttl,
+        max_messages=settings.max_session_messages,
+    )
 
 # Initialize chat service
 current_folder = Path(__file__).parent
@@ -48,11 +94,24 @@ if mistral_client:
         mistral_client=mistral_client,
         model=settings.mistral_model,
         max_iterations=settings.max_chat_iterations,
+        max_history_messages=settings.max_history_messages,
+        min_history_messages=settings.min_history_messages,
+        tool_timeout=settings.tool_timeout,
         prompt_file_path=prompt_file_path,
         logger=logger,
     )
 
 
+def _json_response(model: BaseModel) -> Response:
+    """
+    Serialize a response model to JSON in a single pass
+
+    Returning a Response directly skips FastAPI's re-validation and
+    jsonable_encoder step; the model is serialized by pydantic-core instead.
+    """
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -63,108 +122,219 @@ async def root():
 @app.post("/session")
 async def create_session():
     """Create a new chat session"""
-    session_id = str(uuid.uuid4())
-    session_store.create_session(session_id)
-    logger.info(f"🆕 Created new session: {session_id[:8]}...")
+    session_id = new_session_id()
+    await session_store.create_session(session_id)
+    logger.info("🆕 Created new session: %s...", session_id[:8])
     return {"session_id": session_id}
 
 
 @app.get("/session/{session_id}/messages", response_model=ChatResponse)
 async def get_session_messages(session_id: str):
     """Get all messages for a session"""
-    logger.debug(f"Retrieving messages for session: {session_id[:8]}...")
-    messages = session_store.get_messages(session_id)
-    logger.debug(f"Found {len(messages)} message(s) in session")
-    return {"session_id": session_id, "messages": messages}
-
+    messages = await session_store.get_messages(session_id)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Found %d message(s) in session %s...", len(messages), session_id[:8]
+        )
+    return _json_response(ChatResponse(session_id=session_id, messages=messages))
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(message: Message):
-    """Send a message and get a response from Mistral AI"""
-    logger.info(
-        f"💬 New chat message: '{message.content[:100]}...' (session: {message.session_id[:8]}...)"
-    )
 
-    # Check if Mistral client is initialized
+def _require_chat_service() -> ChatService:
+    """Return the chat service, or reject the request if Mistral is not configured"""
     if not mistral_client or not chat_service:
         logger.error("❌ Mistral API not configured - rejecting chat request")
         raise HTTPException(
             status_code=503,
             detail="Mistral API is not configured. Please set MISTRAL_API_KEY.",
         )
+    return chat_service
+
+
+async def _add_user_message(message: Message) -> dict:
+    """
+    Store the user's message in its session (created on first append)
+
+    Args:
+        message: Incoming chat message
 
-    # Initialize session if it doesn't exist
-    if not session_store.session_exists(message.session_id):
-        session_store.create_session(message.session_id)
-        logger.info(f"🆕 Created new session: {message.session_id[:8]}...")
+    Returns:
+        The stored user message, with the user location appended to its content
+    """
+    sid = message.session_id
 
     # Prepare user message content
     user_content = message.content
 
     # If user location is provided, append it to the message content
-    if message.user_location:
-        logger.info(
-            f"📍 User location: ({message.user_location.latitude}, {message.user_location.longitude})"
-        )
-        user_content = f"{message.content}\n\n[User's current location: Latitude {message.user_location.latitude}, Longitude {message.user_location.longitude}]"
+    location = message.user_location
+    if location:
+        latitude, longitude = location.latitude, location.longitude
+        logger.info("📍 User location: (%s, %s)", latitude, longitude)
+        user_content = f"{user_content}\n\n[User's current location: Latitude {latitude}, Longitude {longitude}]"
 
-    # Add user message to session
     user_message = {
         "role": "user",
         "content": user_content,
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": time.time(),
+    }
+    await session_store.add_message(sid, user_message)
+    return user_message
+
+
+async def _add_turn_messages(session_id: str, turn_messages: List[dict]) -> None:
+    """
+    Store the messages produced by a chat turn
+
+    Args:
+        session_id: Session identifier
+        turn_messages: Tool calls, tool results and final response of the turn
+    """
+    # All messages of a turn share the timestamp taken once the turn completes
+    now = time.time()
+    for msg in turn_messages:
+        msg["timestamp"] = now
+    await session_store.add_messages(session_id, turn_messages)
+
+
+async def _add_error_message(session_id: str, error: Exception) -> None:
+    """Store the error of a failed chat turn as an assistant message"""
+    error_message = {
+        "role": "assistant",
+        "content": f"Error: {str(error)}",
+        "timestamp": time.time(),
     }
-    session_store.add_message(message.session_id, user_message)
+    await session_store.add_message(session_id, error_message)
 
-    try:
-        # Get session messages
-        session_messages = session_store.get_messages(message.session_id)
-        logger.debug(
-            f"Processing message with {len(session_messages)} existing message(s)"
-        )
 
-        # Process message through chat service (returns content + all tool interaction messages)
-        assistant_content, tool_messages = chat_service.process_message(user_content, session_messages)
+def _sse(event: str, data: Union[str, bytes]) -> bytes:
+    """Format one Server-Sent Event"""
+    if isinstance(data, str):
+        data = data.encode()
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
 
-        # Add all tool interaction messages to session (preserves tool calls & results for context)
-        for msg in tool_messages:
-            # Add timestamp to each message before storing
-            msg["timestamp"] = datetime.now().isoformat()
-            session_store.add_message(message.session_id, msg)
 
-        # Return all messages
-        all_messages = session_store.get_messages(message.session_id)
-        logger.info(
-            f"✅ Chat request completed successfully for session {message.session_id[:8]}..."
+@app.post("/chat", response_model=ChatTurnResponse)
+async def chat(message: Message):
+    """Send a message and get a response from Mistral AI (returns only the new messages)"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "💬 New chat message: '%s...' (session: %s...)",
+            message.content[:100],
+            message.session_id[:8],
         )
-        return {
-            "session_id": message.session_id,
-            "messages": all_messages,
-        }
-
-    except Exception as e:
-        # If Mistral API fails, return error message
-        logger.error(f"❌ Chat processing error: {str(e)}", exc_info=True)
-        error_message = {
-            "role": "assistant",
-            "content": f"Error: {str(e)}",
-            "timestamp": datetime.now().isoformat(),
-        }
-        session_store.add_message(message.session_id, error_message)
 
-        raise HTTPException(
-            status_code=500, detail=f"Failed to get response from Mistral AI: {str(e)}"
+    service = _require_chat_service()
+    sid = message.session_id
+
+    # One turn at a time per session so concurrent requests never interleave histories
+    async with session_store.lock(sid):
+        user_message = await _add_user_message(message)
+
+        try:
+            # Get session messages
+            session_messages = await session_store.get_messages(sid)
+            logger.debug(
+                "Processing message with %d existing message(s)", len(session_messages)
+            )
+
+            # Process message through chat service (returns content + all tool interaction messages)
+            assistant_content, tool_messages = await service.process_message(
+                user_message["content"], session_messages
+            )
+
+            # Add all tool interaction messages to session (preserves tool calls & results for context)
+            await _add_turn_messages(sid, tool_messages)
+
+            # Return only this turn's messages (full history: GET /session/{id}/messages)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "✅ Chat request completed successfully for session %s...",
+                    sid[:8],
+                )
+            return _json_response(
+                ChatTurnResponse(
+                    session_id=sid,
+                    new_messages=[user_message, *tool_messages],
+                )
+            )
+
+        except Exception as e:
+            # If Mistral API fails, return error message
+            logger.error("❌ Chat processing error: %s", e, exc_info=True)
+            await _add_error_message(sid, e)
+
+            raise HTTPException(
+                status_code=500, detail=f"Failed to get response from Mistral AI: {str(e)}"
+            )
+
+
+@app.post("/chat/stream")
+async def chat_stream(message: Message):
+    """
+    Send a message and stream the response as Server-Sent Events
+
+    Events: "delta" ({"content": ...}) for each chunk of the model's text,
+    "tool" ({"name": ...}) for each tool called, then "done" with the same
+    body as /chat, or "error" ({"detail": ...}) if the turn fails.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "💬 New streamed chat message: '%s...' (session: %s...)",
+            message.content[:100],
+            message.session_id[:8],
         )
 
+    service = _require_chat_service()
+    sid = message.session_id
+
+    async def event_stream() -> AsyncIterator[bytes]:
+        # Held until the turn is stored (see /chat)
+        async with session_store.lock(sid):
+            try:
+                # Inside the try: once the response has started, failures can
+                # only reach the client as an "error" event
+                user_message = await _add_user_message(message)
+                session_messages = await session_store.get_messages(sid)
+                async for event in service.stream_message(
+                    user_message["content"], session_messages
+                ):
+                    if event["type"] == "delta":
+                        yield _sse("delta", orjson.dumps({"content": event["content"]}))
+                    elif event["type"] == "tool":
+                        yield _sse("tool", orjson.dumps({"name": event["name"]}))
+                    else:
+                        # Stored only once the turn is complete
+                        tool_messages = event["messages"]
+                        await _add_turn_messages(sid, tool_messages)
+                        turn = ChatTurnResponse(
+                            session_id=sid, new_messages=[user_message, *tool_messages]
+                        )
+                        yield _sse("done", turn.model_dump_json())
+            except Exception as e:
+                logger.error("❌ Chat processing error: %s", e, exc_info=True)
+                try:
+                    await _add_error_message(sid, e)
+                except Exception as store_error:
+                    # e.g. the session store itself is down: still report the error
+                    logger.error("❌ Failed to store chat error: %s", store_error)
+                detail = f"Failed to get response from Mistral AI: {str(e)}"
+                yield _sse("error", orjson.dumps({"detail": detail}))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
 @app.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session and its messages"""
-    logger.info(f"🗑️  Deleting session: {session_id[:8]}...")
-    if session_store.delete_session(session_id):
-        logger.info(f"✅ Session deleted: {session_id[:8]}...")
+    logger.info("🗑️  Deleting session: %s...", session_id[:8])
+    if await session_store.delete_session(session_id):
+        logger.info("✅ Session deleted: %s...", session_id[:8])
         return {"message": "Session deleted"}
-    logger.warning(f"⚠️  Session not found for deletion: {session_id[:8]}...")
+    logger.warning("⚠️  Session not found for deletion: %s...", session_id[:8])
     return {"message": "Session not found"}
 
 
@@ -2,8 +2,9 @@
 Pydantic models for MTL Finder backend API
 """
 
+from datetime import datetime, timezone
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, field_serializer
 
 
 class UserLocation(BaseModel):
@@ -26,7 +27,12 @@ class ChatMessage(BaseModel):
 
     role: str  # "user" or "assistant"
     content: str
-    timestamp: str
+    timestamp: float  # Epoch seconds, formatted as ISO 8601 on output
+
+    @field_serializer("timestamp")
+    def serialize_timestamp(self, timestamp: float) -> str:
+        """Format the stored epoch timestamp as an ISO 8601 string in UTC"""
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
 
 
 class ChatResponse(BaseModel):
@@ -34,3 +40,10 @@ class ChatResponse(BaseModel):
 
     session_id: str
     messages: List[ChatMessage]
+
+
+class ChatTurnResponse(BaseModel):
+    """Response containing only the messages added during one chat turn"""
+
+    session_id: str
+    new_messages: List[ChatMessage]
@@ -2,15 +2,23 @@
 Chat service for handling Mistral AI interactions with tool calling
 """
 
-import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Any, AsyncIterator, List, Optional
 
+import orjson
 from mistralai import Mistral
+from mistralai.models import Tool
 
 from tools import TOOLS, execute_tool
 
+# Tool schemas validated into SDK models once at import; the client passes
+# model instances through instead of re-validating the dicts on every call
+MISTRAL_TOOLS = [Tool.model_validate(tool) for tool in TOOLS]
+
 
 class ChatService:
     """Service for handling Mistral AI chat interactions with function calling"""
@@ -22,6 +30,10 @@ class ChatService:
         max_iterations: int,
         prompt_file_path: Path,
         logger: logging.Logger,
+        max_history_messages: int = 40,
+        min_history_messages: int = 20,
+        max_tool_workers: int = 16,
+        tool_timeout: float = 12,
     ):
         """
         Initialize ChatService
@@ -32,19 +44,36 @@ class ChatService:
             max_iterations: Maximum number of tool calling iterations
             prompt_file_path: Path to system prompt file
             logger: Logger instance
+            max_history_messages: Maximum number of history messages sent to Mistral
+            min_history_messages: History messages kept when the window jumps forward
+            max_tool_workers: Threads running tool calls (shared by all requests)
+            tool_timeout: Seconds a tool call may take before the model is told it failed
         """
         self.client = mistral_client
         self.model = model
         self.max_iterations = max_iterations
+        self.max_history_messages = max_history_messages
+        self.min_history_messages = min_history_messages
+        self.tool_timeout = tool_timeout
         self.logger = logger
 
-        # Load system prompt once at initialization
-        self.logger.debug(f"Loading system prompt from {prompt_file_path}")
-        with open(prompt_file_path) as f:
-            self.system_prompt = f.read()
-        self.logger.info(f"✅ System prompt loaded ({len(self.system_prompt)} characters)")
+        # Dedicated pool for the blocking tool calls, sized like the tools'
+        # HTTP connection pool and kept apart from the loop's default executor
+        self._tool_pool = ThreadPoolExecutor(
+            max_workers=max_tool_workers, thread_name_prefix="tool"
+        )
+
+        # Load system prompt once at initialization (never re-read per request)
+        self.logger.debug("Loading system prompt from %s", prompt_file_path)
+        self.system_prompt = prompt_file_path.read_text(encoding="utf-8")
+        self._system_msg = {"role": "system", "content": self.system_prompt}
+        self.logger.info("✅ System prompt loaded (%d characters)", len(self.system_prompt))
 
-    def process_message(
+    def close(self) -> None:
+        """Stop the tool worker threads"""
+        self._tool_pool.shutdown(wait=False)
+
+    async def process_message(
         self,
         user_content: str,
         session_messages: List[dict],
@@ -69,10 +98,10 @@ class ChatService:
         new_session_messages = []
 
         # Call Mistral API with tools - loop to handle multiple rounds of tool calls
-        response = self.client.chat.complete(
+        response = await self.client.chat.complete_async(
             model=self.model,
             messages=mistral_messages,
-            tools=TOOLS,
+            tools=MISTRAL_TOOLS,
         )
 
         # Loop to handle multiple rounds of tool calls
@@ -86,66 +115,30 @@ class ChatService:
                 break
 
             self.logger.info(
-                f"🔄 Iteration {iteration}: Model requested {len(assistant_message_obj.tool_calls)} tool call(s)"
+                "🔄 Iteration %d: Model requested %d tool call(s)",
+                iteration,
+                len(assistant_message_obj.tool_calls),
             )
 
             # Add assistant's tool call message to conversation
-            tool_call_message = {
-                "role": "assistant",
-                "content": assistant_message_obj.content or "",
-                "tool_calls": [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments,
-                        },
-                    }
-                    for tc in assistant_message_obj.tool_calls
-                ],
-            }
+            tool_call_message = self._build_tool_call_message(
+                assistant_message_obj.content, assistant_message_obj.tool_calls
+            )
             mistral_messages.append(tool_call_message)
             new_session_messages.append(tool_call_message)  # Store for session history
 
-            # Execute each tool call
-            for tool_call in assistant_message_obj.tool_calls:
-                # Parse arguments
-                try:
-                    arguments = json.loads(tool_call.function.arguments)
-                except json.JSONDecodeError as e:
-                    self.logger.warning(f"⚠️  Failed to parse tool arguments: {e}")
-                    arguments = {}
-
-                # Log tool call details
-                self.logger.info(f"📞 Calling tool: {tool_call.function.name}")
-                self.logger.debug(f"📋 Arguments: {json.dumps(arguments, indent=2)}")
-
-                # Execute the tool
-                tool_result = execute_tool(tool_call.function.name, arguments)
-
-                # Log tool result (truncate if too long)
-                result_str = json.dumps(tool_result, indent=2)
-                if len(result_str) > 500:
-                    self.logger.debug(f"✅ Result (truncated): {result_str[:500]}...")
-                else:
-                    self.logger.debug(f"✅ Result: {result_str}")
-
-                # Add tool result to messages
-                tool_message = {
-                    "role": "tool",
-                    "name": tool_call.function.name,
-                    "content": json.dumps(tool_result),
-                    "tool_call_id": tool_call.id,
-                }
-                mistral_messages.append(tool_message)
-                new_session_messages.append(tool_message)  # Store for session history
+            # Execute the tool calls concurrently (results kept in call order)
+            tool_messages = await asyncio.gather(
+                *[self._run_tool_call(tool_call) for tool_call in assistant_message_obj.tool_calls]
+            )
+            mistral_messages.extend(tool_messages)
+            new_session_messages.extend(tool_messages)  # Store for session history
 
             # Call Mistral again with tool results
-            response = self.client.chat.complete(
+            response = await self.client.chat.complete_async(
                 model=self.model,
                 messages=mistral_messages,
-                tools=TOOLS,
+                tools=MISTRAL_TOOLS,
             )
 
         # Extract final assistant response
@@ -158,41 +151,248 @@ class ChatService:
         }
         new_session_messages.append(final_message)
 
-        self.logger.info(f"✅ Chat processing complete after {iteration} iteration(s)")
+        self.logger.info("✅ Chat processing complete after %d iteration(s)", iteration)
         return assistant_content, new_session_messages
 
+    async def stream_message(
+        self,
+        user_content: str,
+        session_messages: List[dict],
+    ) -> AsyncIterator[dict]:
+        """
+        Process a user message like process_message, streaming the model's text
+
+        Tool rounds still run server-side; text chunks are yielded as soon as
+        Mistral produces them. Text the model writes before calling tools is
+        streamed too, separated from the next round's text by a blank line.
+
+        Args:
+            user_content: The user's message content
+            session_messages: Conversation history for this session
+
+        Yields:
+            {"type": "delta", "content": ...} for each text chunk,
+            {"type": "tool", "name": ...} for each tool called, then one
+            {"type": "done", "content": ..., "messages": [...]} with the new messages
+
+        Raises:
+            Exception: If Mistral API call fails
+        """
+        # Build Mistral messages with system prompt
+        mistral_messages = self._build_mistral_messages(session_messages)
+
+        # Track new messages to store in session (tool calls + results)
+        new_session_messages = []
+        # Whether text was streamed in an earlier round (see the separator below)
+        streamed_text = False
+
+        # The first call plus one call after each round of tool calls
+        for iteration in range(1, self.max_iterations + 2):
+            content_parts: List[str] = []
+            tool_calls: List[Any] = []
+            tool_tasks: List[asyncio.Task[dict]] = []
+            may_call_tools = iteration <= self.max_iterations
+
+            stream = await self.client.chat.stream_async(
+                model=self.model,
+                messages=mistral_messages,
+                tools=MISTRAL_TOOLS,
+            )
+            try:
+                async for event in stream:
+                    delta = event.data.choices[0].delta
+                    if delta.tool_calls:
+                        tool_calls.extend(delta.tool_calls)
+                        if may_call_tools:
+                            # Mistral sends each tool call complete: start it right
+                            # away while the rest of the response is still arriving
+                            for tool_call in delta.tool_calls:
+                                tool_tasks.append(
+                                    asyncio.ensure_future(self._run_tool_call(tool_call))
+                                )
+                                yield {"type": "tool", "name": tool_call.function.name}
+                    if isinstance(delta.content, str) and delta.content:
+                        if streamed_text and not content_parts:
+                            # Don't run a tool round's text into this round's
+                            yield {"type": "delta", "content": "\n\n"}
+                        content_parts.append(delta.content)
+                        yield {"type": "delta", "content": delta.content}
+            except BaseException:
+                for task in tool_tasks:
+                    task.cancel()
+                raise
+
+            # Stop once the model answers without tools (or the round limit is hit)
+            if not tool_tasks:
+                self.logger.debug("No more tool calls requested. Iteration complete.")
+                break
+
+            self.logger.info(
+                "🔄 Iteration %d: Model requested %d tool call(s)",
+                iteration,
+                len(tool_calls),
+            )
+            streamed_text = streamed_text or bool(content_parts)
+
+            # Add assistant's tool call message to conversation
+            tool_call_message = self._build_tool_call_message(
+                "".join(content_parts), tool_calls
+            )
+            mistral_messages.append(tool_call_message)
+            new_session_messages.append(tool_call_message)  # Store for session history
+
+            # Wait for the tool calls started during the stream (results kept in call order)
+            tool_messages = await asyncio.gather(*tool_tasks)
+            mistral_messages.extend(tool_messages)
+            new_session_messages.extend(tool_messages)  # Store for session history
+
+        # Add final assistant message to session messages
+        assistant_content = "".join(content_parts)
+        new_session_messages.append({"role": "assistant", "content": assistant_content})
+
+        self.logger.info("✅ Chat streaming complete after %d iteration(s)", iteration)
+        yield {"type": "done", "content": assistant_content, "messages": new_session_messages}
+
+    async def _run_tool_call(self, tool_call: Any) -> dict:
+        """
+        Execute one tool call requested by the model
+
+        Args:
+            tool_call: Tool call returned by Mistral
+
+        Returns:
+            Tool result message in Mistral format (also stored in the session)
+        """
+        # Parse arguments (the SDK may already hand them over decoded)
+        raw_arguments = tool_call.function.arguments
+        if isinstance(raw_arguments, dict):
+            arguments = raw_arguments
+        else:
+            try:
+                arguments = orjson.loads(raw_arguments)
+            except orjson.JSONDecodeError as e:
+                self.logger.warning("⚠️  Failed to parse tool arguments: %s", e)
+                arguments = {}
+            if not isinstance(arguments, dict):
+                self.logger.warning("⚠️  Tool arguments are not an object: %s", raw_arguments)
+                arguments = {}
+
+        # Log tool call details
+        self.logger.info("📞 Calling tool: %s", tool_call.function.name)
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.logger.debug("📋 Arguments: %s", raw_arguments)
+
+        # Execute the tool (blocking HTTP clients, so off the event loop). Calls of a
+        # round run concurrently, so the round waits at most one tool_timeout
+        call = asyncio.get_running_loop().run_in_executor(
+            self._tool_pool, execute_tool, tool_call.function.name, arguments
+        )
+        done, _ = await asyncio.wait((call,), timeout=self.tool_timeout)
+        if done:
+            tool_result = call.result()
+        else:
+            # The worker thread finishes on its own; its result is dropped
+            call.cancel()
+            self.logger.warning(
+                "⏱️  Tool %s exceeded %ss budget", tool_call.function.name, self.tool_timeout
+            )
+            tool_result = {"error": f"Tool {tool_call.function.name} timed out"}
+        content = orjson.dumps(tool_result).decode()
+
+        # Log tool result (truncate if too long)
+        if debug:
+            if len(content) > 500:
+                self.logger.debug("✅ Result (truncated): %s...", content[:500])
+            else:
+                self.logger.debug("✅ Result: %s", content)
+
+        return {
+            "role": "tool",
+            "name": tool_call.function.name,
+            "content": content,
+            "tool_call_id": tool_call.id,
+        }
+
+    @staticmethod
+    def _build_tool_call_message(content: Optional[str], tool_calls: List[Any]) -> dict:
+        """
+        Build the assistant message recording the tool calls requested by the model
+
+        Args:
+            content: Text returned by the model alongside the tool calls
+            tool_calls: Tool calls returned by Mistral
+
+        Returns:
+            Message dictionary in Mistral format (also stored in the session)
+        """
+        return {
+            "role": "assistant",
+            "content": content or "",
+            "tool_calls": [
+                {
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments,
+                    },
+                }
+                for tc in tool_calls
+            ],
+        }
+
     def _build_mistral_messages(self, session_messages: List[dict]) -> List[dict]:
         """
         Build Mistral API message list with system prompt
 
+        Session messages are stored in Mistral format already (tool calls and
+        tool results included); extra keys such as timestamp are ignored by the
+        SDK, so they are passed through as-is instead of being copied.
+
         Args:
             session_messages: Conversation history for this session
 
         Returns:
             List of messages formatted for Mistral API
         """
-        mistral_messages = []
-
-        # ALWAYS add system prompt to maintain context
-        system_prompt = {"role": "system", "content": self.system_prompt}
-        mistral_messages.append(system_prompt)
+        # ALWAYS add system prompt to maintain context; the list is allocated
+        # once and shares the stored message dicts (no per-message copy)
+        start = self._history_start(session_messages)
+        return [self._system_msg, *islice(session_messages, start, None)]
 
-        # Add conversation history, preserving tool calls and tool results
-        for msg in session_messages:
-            # Build message with required fields
-            mistral_msg = {"role": msg["role"], "content": msg["content"]}
-
-            # Preserve tool_calls if present (assistant messages with function calls)
-            if "tool_calls" in msg:
-                mistral_msg["tool_calls"] = msg["tool_calls"]
+    def _history_start(self, session_messages: List[dict]) -> int:
+        """
+        Find where the window of recent turns sent to Mistral starts
 
-            # Preserve tool-specific fields (tool result messages)
-            if msg["role"] == "tool":
-                if "name" in msg:
-                    mistral_msg["name"] = msg["name"]
-                if "tool_call_id" in msg:
-                    mistral_msg["tool_call_id"] = msg["tool_call_id"]
+        The window start only moves forward in jumps of
+        (max_history_messages - min_history_messages) messages, so the prefix
+        sent to Mistral stays identical from one turn to the next and its
+        prompt cache keeps being reused between jumps. The start is derived
+        from the history length alone, so every worker picks the same window.
+        It is then moved to a user message so a tool result is never sent
+        without the assistant tool call that requested it.
 
-            mistral_messages.append(mistral_msg)
+        Args:
+            session_messages: Conversation history for this session
 
-        return mistral_messages
+        Returns:
+            Index of the first message sent: between min_history_messages and
+            max_history_messages of the last messages are kept (fewer once
+            aligned on a user turn)
+        """
+        total = len(session_messages)
+        if total <= self.max_history_messages:
+            return 0
+
+        step = max(1, self.max_history_messages - self.min_history_messages)
+        window_start = (total - self.min_history_messages) // step * step
+
+        for start in range(window_start, total):
+            if session_messages[start]["role"] == "user":
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        "Sending %d of %d history message(s)", total - start, total
+                    )
+                return start
+        return 0
@@ -0,0 +1,45 @@
+"""
+Identifier generation for chat sessions
+"""
+
+import os
+import threading
+
+# Random bytes read per os.urandom call (64 identifiers)
+_BUFFER_SIZE = 1024
+_ID_SIZE = 16
+
+_local = threading.local()
+
+
+def _reset_buffer() -> None:
+    """Drop buffered random bytes so a forked process never reuses its parent's"""
+    _local.buffer = b""
+    _local.offset = 0
+
+
+os.register_at_fork(after_in_child=_reset_buffer)
+
+
+def new_session_id() -> str:
+    """
+    Generate a random session identifier (RFC 4122 version 4 UUID as 32 hex chars)
+
+    Random bytes are read from the OS in blocks and sliced per call, so the
+    getrandom syscall is paid once every 64 identifiers instead of every time.
+
+    Returns:
+        Session ID, same format as uuid.uuid4().hex
+    """
+    buffer = getattr(_local, "buffer", b"")
+    offset = getattr(_local, "offset", 0)
+    if offset + _ID_SIZE > len(buffer):
+        buffer = os.urandom(_BUFFER_SIZE)
+        offset = 0
+        _local.buffer = buffer
+    _local.offset = offset + _ID_SIZE
+
+    chunk = bytearray(buffer[offset : offset + _ID_SIZE])
+    chunk[6] = (chunk[6] & 0x0F) | 0x40  # Version 4
+    chunk[8] = (chunk[8] & 0x3F) | 0x80  # RFC 4122 variant
+    return chunk.hex()
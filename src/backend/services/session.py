@@ -2,17 +2,71 @@
 Session storage and management for chat conversations
 """
 
-from typing import Dict, List
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import msgpack
+import redis
+import redis.asyncio
+from cachetools import TTLCache
+
+
+class SessionLocks:
+    """Per-session asyncio locks, dropped once no request holds or waits on them"""
+
+    def __init__(self):
+        """Initialize the lock table"""
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    def get(self, session_id: str) -> asyncio.Lock:
+        """
+        Get the lock of a session, creating it if needed
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            The session's lock (kept alive by the callers referencing it)
+        """
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
 
 
 class SessionStore:
     """In-memory session storage for chat conversations"""
 
-    def __init__(self):
-        """Initialize in-memory storage"""
-        self._sessions: Dict[str, List[dict]] = {}
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600, max_messages: int = 200):
+        """
+        Initialize in-memory storage
 
-    def create_session(self, session_id: str) -> None:
+        Args:
+            maxsize: Maximum number of sessions kept (least recently used evicted first)
+            ttl: Seconds a session is kept after its last new message
+            max_messages: Messages kept per session before the oldest turns are dropped
+        """
+        self._sessions: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._max_messages = max_messages
+        self._locks = SessionLocks()
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Hold a session exclusively for the duration of a chat turn
+
+        Args:
+            session_id: Session identifier
+        """
+        async with self._locks.get(session_id):
+            yield
+
+    async def create_session(self, session_id: str) -> None:
         """
         Create a new session
 
@@ -21,7 +75,7 @@ class SessionStore:
         """
         self._sessions[session_id] = []
 
-    def get_messages(self, session_id: str) -> List[dict]:
+    async def get_messages(self, session_id: str) -> List[dict]:
         """
         Get all messages for a session
 
@@ -29,25 +83,66 @@ class SessionStore:
             session_id: Session identifier
 
         Returns:
-            List of message dictionaries
+            List of message dictionaries (empty for an unknown session)
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = []
-        return self._sessions[session_id]
+        return self._sessions.get(session_id, [])
 
-    def add_message(self, session_id: str, message: dict) -> None:
+    async def add_message(self, session_id: str, message: dict) -> int:
         """
-        Add a message to a session
+        Add a message to a session, creating the session if needed
 
         Args:
             session_id: Session identifier
             message: Message dictionary with role, content, timestamp
+
+        Returns:
+            Number of messages in the session after the append
         """
-        if session_id not in self._sessions:
-            self._sessions[session_id] = []
-        self._sessions[session_id].append(message)
+        return await self.add_messages(session_id, [message])
 
-    def delete_session(self, session_id: str) -> bool:
+    async def add_messages(self, session_id: str, messages: List[dict]) -> int:
+        """
+        Add several messages to a session at once, creating the session if needed
+
+        Args:
+            session_id: Session identifier
+            messages: Message dictionaries with role, content, timestamp
+
+        Returns:
+            Number of messages in the session after the append
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = []
+        session.extend(messages)
+        if len(session) > self._max_messages:
+            self._trim(session)
+        # Re-assign so the TTL restarts on every write, like EXPIRE in Redis
+        self._sessions[session_id] = session
+        return len(session)
+
+    def _trim(self, session: List[dict]) -> None:
+        """
+        Drop the oldest turns, down to half of max_messages
+
+        Trimming in one large batch (rather than a few messages every turn)
+        keeps the history prefix stable between trims. Cuts only at a user
+        message so tool calls are never separated from their results.
+
+        Args:
+            session: Session message list, trimmed in place
+        """
+        target = len(session) - self._max_messages // 2
+        start = 0
+        for index, message in enumerate(session):
+            if message["role"] == "user":
+                start = index
+                if index >= target:
+                    break
+        # Falls back to the latest user message when the last turns are longer
+        del session[:start]
+
+    async def delete_session(self, session_id: str) -> bool:
         """
         Delete a session
 
@@ -62,7 +157,7 @@ class SessionStore:
             return True
         return False
 
-    def session_exists(self, session_id: str) -> bool:
+    async def session_exists(self, session_id: str) -> bool:
         """
         Check if a session exists
 
@@ -73,3 +168,315 @@ class SessionStore:
             True if session exists, False otherwise
         """
         return session_id in self._sessions
+
+    async def close(self) -> None:
+        """Release resources held by the store (nothing to release in memory)"""
+
+
+# RPUSH + EXPIRE, then the same trim as SessionStore._trim, in one atomic call.
+# KEYS[1]: session list; ARGV: ttl, max_messages, packed messages.
+# User messages are recognized by their msgpack-encoded "role": "user" pair:
+# the 0xA4 string header can't follow an ASCII letter inside UTF-8 text
+_APPEND_SCRIPT = """
+local length = redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+local max_messages = tonumber(ARGV[2])
+if length <= max_messages then
+    return length
+end
+local target = length - math.floor(max_messages / 2)
+local start = 0
+for index, entry in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+    if string.find(entry, '\\164role\\164user', 1, true) then
+        start = index - 1
+        if start >= target then
+            break
+        end
+    end
+end
+if start > 0 then
+    redis.call('LTRIM', KEYS[1], start, -1)
+end
+return length - start
+"""
+
+
+class RedisSessionStore:
+    """
+    Redis-backed session storage for chat conversations
+
+    Each session is a Redis list of msgpack-encoded messages that expires after
+    `ttl` seconds of inactivity, so state is shared across worker processes and
+    abandoned sessions are evicted automatically. Lists are trimmed like the
+    in-memory store's sessions once they exceed `max_messages`.
+    """
+
+    def __init__(self, redis_url: str, ttl: int = 3600, max_messages: int = 200):
+        """
+        Initialize the asyncio Redis client and its connection pool
+
+        Args:
+            redis_url: Redis connection URL (e.g., "redis://localhost:6379/0")
+            ttl: Session expiry in seconds, refreshed on every write
+            max_messages: Messages kept per session before the oldest turns are dropped
+        """
+        pool = redis.asyncio.ConnectionPool.from_url(redis_url)
+        self._redis = redis.asyncio.Redis.from_pool(pool)
+        self._ttl = ttl
+        self._max_messages = max_messages
+        self._append = self._redis.register_script(_APPEND_SCRIPT)
+
+    @asynccontextmanager
+    async def lock(self, session_id: str, timeout: float = 120.0) -> AsyncIterator[None]:
+        """
+        Hold a session exclusively across all workers for a chat turn
+
+        Uses SET NX PX with a random token (released by a Lua compare-and-delete),
+        polling with asyncio.sleep while another worker holds it.
+
+        Args:
+            session_id: Session identifier
+            timeout: Seconds after which an unreleased lock expires
+        """
+        lock = self._redis.lock(
+            f"lock:{self._key(session_id)}", timeout=timeout, sleep=0.05
+        )
+        await lock.acquire()
+        try:
+            yield
+        finally:
+            try:
+                await lock.release()
+            except redis.exceptions.LockError:
+                # Expired and possibly taken by another turn; nothing to release
+                pass
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        """Build the Redis key for a session"""
+        return f"session:{session_id}"
+
+    async def create_session(self, session_id: str) -> None:
+        """
+        Create a new session
+
+        Redis lists only exist once they hold an element, so this resets any
+        previous history and lets the first `add_message` create the list.
+
+        Args:
+            session_id: Unique session identifier
+        """
+        await self._redis.delete(self._key(session_id))
+
+    async def get_messages(self, session_id: str) -> List[dict]:
+        """
+        Get all messages for a session
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            List of message dictionaries
+        """
+        entries = await self._redis.lrange(self._key(session_id), 0, -1)
+        return [msgpack.unpackb(entry) for entry in entries]
+
+    async def get_messages_since(
+        self, session_id: str, start: int
+    ) -> Tuple[Optional[dict], List[dict]]:
+        """
+        Get the messages of a session from a given index, in one round-trip
+
+        Args:
+            session_id: Session identifier
+            start: Index of the first message to return
+
+        Returns:
+            Tuple of (first message of the session or None if it is empty,
+            messages from `start` onwards)
+        """
+        key = self._key(session_id)
+        pipe = self._redis.pipeline()
+        pipe.lindex(key, 0)
+        pipe.lrange(key, start, -1)
+        first, entries = await pipe.execute()
+        head = msgpack.unpackb(first) if first is not None else None
+        return head, [msgpack.unpackb(entry) for entry in entries]
+
+    async def add_message(self, session_id: str, message: dict) -> int:
+        """
+        Add a message to a session and refresh its expiry
+
+        Args:
+            session_id: Session identifier
+            message: Message dictionary with role, content, timestamp
+
+        Returns:
+            Number of messages in the session after the append
+        """
+        return await self.add_messages(session_id, [message])
+
+    async def add_messages(self, session_id: str, messages: List[dict]) -> int:
+        """
+        Add several messages to a session in a single RPUSH, refresh its expiry
+        and drop the oldest turns past max_messages (see SessionStore._trim)
+
+        Args:
+            session_id: Session identifier
+            messages: Message dictionaries with role, content, timestamp
+
+        Returns:
+            Number of messages in the session after the append (and trim)
+        """
+        key = self._key(session_id)
+        if not messages:
+            return await self._redis.llen(key)
+        return await self._append(
+            keys=[key],
+            args=[
+                self._ttl,
+                self._max_messages,
+                *[msgpack.packb(message) for message in messages],
+            ],
+        )
+
+    async def delete_session(self, session_id: str) -> bool:
+        """
+        Delete a session
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if session was deleted, False if not found
+        """
+        return await self._redis.delete(self._key(session_id)) > 0
+
+    async def session_exists(self, session_id: str) -> bool:
+        """
+        Check if a session exists
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            True if session exists, False otherwise
+        """
+        return await self._redis.exists(self._key(session_id)) > 0
+
+    async def close(self) -> None:
+        """Close the Redis client and its connection pool"""
+        await self._redis.aclose()
+
+
+class CachedSessionStore:
+    """
+    Per-process front cache for a RedisSessionStore
+
+    Keeps recently used sessions in a small TTL cache. Reads only fetch the
+    messages appended since the cached copy (by this or another worker), and
+    writes extend the cached copy when Redis confirms nothing else was
+    appended in between; otherwise the entry is dropped and refetched.
+
+    While this process holds a session's turn lock no other worker can append
+    to it, so once a read or write has confirmed the cached copy, further
+    reads of the turn are served from the cache without a round trip.
+    """
+
+    def __init__(self, store: RedisSessionStore, maxsize: int = 1024, ttl: float = 5.0):
+        """
+        Initialize the front cache
+
+        Args:
+            store: Backing Redis session store
+            maxsize: Maximum number of cached sessions
+            ttl: Seconds a cached session is kept without being refreshed
+        """
+        self._store = store
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._locks = SessionLocks()
+        # Sessions locked by this process -> whether their cached copy is confirmed
+        self._held: Dict[str, bool] = {}
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """Hold a session exclusively (see RedisSessionStore.lock)"""
+        # Queue same-process turns locally instead of polling Redis
+        async with self._locks.get(session_id), self._store.lock(session_id):
+            self._held[session_id] = False
+            try:
+                yield
+            finally:
+                del self._held[session_id]
+
+    def _store_cached(self, session_id: str, messages: List[dict]) -> None:
+        """Cache a copy confirmed by Redis, trusted for the rest of a held turn"""
+        self._cache[session_id] = messages
+        if session_id in self._held:
+            self._held[session_id] = True
+
+    def _drop_cached(self, session_id: str) -> None:
+        """Forget the cached copy of a session"""
+        self._cache.pop(session_id, None)
+        if session_id in self._held:
+            self._held[session_id] = False
+
+    async def create_session(self, session_id: str) -> None:
+        """Create a new session (see RedisSessionStore.create_session)"""
+        self._drop_cached(session_id)
+        await self._store.create_session(session_id)
+
+    async def get_messages(self, session_id: str) -> List[dict]:
+        """
+        Get all messages for a session
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            List of message dictionaries
+        """
+        cached = self._cache.get(session_id)
+        if cached is not None and self._held.get(session_id):
+            return list(cached)
+        if cached is None:
+            messages = await self._store.get_messages(session_id)
+        else:
+            first, tail = await self._store.get_messages_since(session_id, len(cached))
+            # Trimming or resetting the history elsewhere replaces its first
+            # message (timestamps make it unique): the cached prefix is stale
+            if not cached or first == cached[0]:
+                messages = cached + tail
+            else:
+                messages = await self._store.get_messages(session_id)
+        self._store_cached(session_id, messages)
+        return list(messages)
+
+    async def add_message(self, session_id: str, message: dict) -> int:
+        """Add a message to a session (see RedisSessionStore.add_message)"""
+        return await self.add_messages(session_id, [message])
+
+    async def add_messages(self, session_id: str, messages: List[dict]) -> int:
+        """Add several messages to a session (see RedisSessionStore.add_messages)"""
+        length = await self._store.add_messages(session_id, messages)
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            if length == len(cached) + len(messages):
+                self._store_cached(session_id, cached + messages)
+            else:
+                self._drop_cached(session_id)
+        return length
+
+    async def delete_session(self, session_id: str) -> bool:
+        """Delete a session (see RedisSessionStore.delete_session)"""
+        self._drop_cached(session_id)
+        return await self._store.delete_session(session_id)
+
+    async def session_exists(self, session_id: str) -> bool:
+        """Check if a session exists (see RedisSessionStore.session_exists)"""
+        return await self._store.session_exists(session_id)
+
+    async def close(self) -> None:
+        """Close the backing store (see RedisSessionStore.close)"""
+        self._cache.clear()
+        await self._store.close()
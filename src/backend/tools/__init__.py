@@ -3,6 +3,7 @@ Tools package for Mistral AI function calling
 """
 
 from .definitions import TOOLS
-from .registry import execute_tool
+from .registry import execute_tool, warm_up_connections
+from .transit_tool import run_alerts_refresh
 
-__all__ = ["TOOLS", "execute_tool"]
+__all__ = ["TOOLS", "execute_tool", "run_alerts_refresh", "warm_up_connections"]
@@ -0,0 +1,360 @@
+"""
+Result cache for idempotent tool calls
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+import redis
+from cachetools import TLRUCache
+
+from config import get_settings
+from .routing_tool import trip_time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a successful result stays valid, per tool (tools not listed are never
+# cached; get_stm_alerts keeps its own copy of the feed, shared by every filter)
+TOOL_CACHE_TTLS: Dict[str, int] = {
+    "geocode_location": 7 * 24 * 3600,  # Places don't move
+    "get_weather": 600,  # Current conditions
+    "plan_trip": 120,  # Itineraries for a given minute
+}
+
+# Seconds an expired result may still be served when the tool fails
+TOOL_STALE_TTLS: Dict[str, int] = {
+    "get_weather": 3600,
+    "plan_trip": 600,  # Same trip, same requested minute: the timetable still holds
+}
+
+# Writes between two purges of the expired rows of the SQLite tier
+SQLITE_PRUNE_INTERVAL = 256
+
+# Seconds a definitive "nothing found" answer (an error result with a count of 0)
+# is cached, so repeated misses don't hit the service again
+TOOL_NEGATIVE_TTLS: Dict[str, int] = {
+    "geocode_location": 300,
+}
+
+
+def _geocode_key(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Ignore case and spacing in the query; the geocoder does too"""
+    return {
+        "query": " ".join(str(arguments["query"]).split()).casefold(),
+        "limit": min(int(float(arguments.get("limit", 1))), 5),  # Capped by the tool
+    }
+
+
+def _weather_key(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Round coordinates to ~1 km; conditions don't change within that distance"""
+    return {
+        "latitude": round(float(arguments["latitude"]), 2),
+        "longitude": round(float(arguments["longitude"]), 2),
+    }
+
+
+def _plan_trip_key(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Round coordinates to ~10 m and bucket the departure/arrival time to the minute"""
+    key = dict(arguments)
+    for name in ("from_lat", "from_lon", "to_lat", "to_lon"):
+        key[name] = round(float(arguments[name]), 4)
+    key["mode"] = str(arguments.get("mode", "ALL")).upper()
+    key["arrive_by"] = bool(arguments.get("arrive_by", False))
+    # Explicit times are normalized like plan_trip sends them (local minute);
+    # "now" requests (and invalid times) share the current minute
+    key["time"] = trip_time(arguments.get("time")) or time.strftime(
+        "now %Y-%m-%dT%H:%M"
+    )
+    return key
+
+
+# Arguments that give the same result are mapped to the same cache key
+_KEY_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "geocode_location": _geocode_key,
+    "get_weather": _weather_key,
+    "plan_trip": _plan_trip_key,
+}
+
+
+def canonical_args(tool_name: str, arguments: Dict[str, Any]) -> bytes:
+    """
+    Serialize the arguments of a call into its cache key
+
+    Args:
+        tool_name: Name of the tool
+        arguments: Arguments of the call
+
+    Returns:
+        Sort-keyed JSON of the (normalized) arguments
+    """
+    key_builder = _KEY_BUILDERS.get(tool_name)
+    if key_builder is not None:
+        try:
+            arguments = key_builder(arguments)
+        except (KeyError, TypeError, ValueError, OverflowError):
+            pass  # Malformed call: key on the raw arguments, the tool reports the error
+    return orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS)
+
+
+class ToolResultCache:
+    """
+    Per-tool TTL cache of tool results
+
+    Results are shared across workers through Redis when a URL is given,
+    otherwise persisted in a local SQLite file when a path is given (they
+    survive restarts), otherwise kept in process memory. Entries of tools
+    with a stale window are kept past their TTL so they can stand in when
+    the tool fails; definitive misses are kept briefly for tools that allow it.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        sqlite_path: Optional[str] = None,
+        maxsize: int = 4096,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            redis_url: Redis connection URL
+            sqlite_path: SQLite file used when no Redis URL is given
+            maxsize: Maximum number of results kept in memory (without Redis or SQLite)
+        """
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._sqlite = (
+            self._open_sqlite(sqlite_path) if sqlite_path and not redis_url else None
+        )
+        # Entries carry wall-clock times (shared with Redis/SQLite), so the
+        # in-memory cache must compare them against the same clock
+        self._local: TLRUCache = TLRUCache(
+            maxsize=maxsize, ttu=self._expires_at, timer=time.time
+        )
+        self._lock = threading.Lock()  # Tools run in worker threads
+        self._sqlite_writes = 0  # Since the last purge of expired rows
+
+    @staticmethod
+    def _open_sqlite(path: str) -> sqlite3.Connection:
+        """
+        Open the SQLite cache file, creating its table and dropping expired rows
+
+        Args:
+            path: Path of the database file
+
+        Returns:
+            Connection shared by the tool threads (serialized by the cache lock)
+        """
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),))
+        logger.info("🗄️  Tool cache persisted in %s", path)
+        return conn
+
+    @staticmethod
+    def _expires_at(key: Tuple[str, bytes], value: Any, now: float) -> float:
+        """Expiry time of a local entry: end of its TTL plus the tool's stale window"""
+        fresh_until, result = value
+        if "error" in result:
+            return fresh_until  # Negative results are never served as stale
+        return fresh_until + TOOL_STALE_TTLS.get(key[0], 0)
+
+    @staticmethod
+    def _entry_key(tool_name: str, canonical_args: bytes) -> str:
+        """Build the Redis/SQLite key for a tool call"""
+        return f"tool:{tool_name}:{hashlib.sha256(canonical_args).hexdigest()}"
+
+    def _lookup(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """
+        Find the stored entry of a call, fresh or stale
+
+        Args:
+            tool_name: Name of the tool
+            arguments: Arguments of the call
+
+        Returns:
+            (fresh_until, result), or None if nothing is stored
+        """
+        args_key = canonical_args(tool_name, arguments)
+
+        if self._redis is not None:
+            try:
+                cached = self._redis.get(self._entry_key(tool_name, args_key))
+            except redis.RedisError as e:
+                logger.warning("⚠️  Tool cache unavailable: %s", e)
+                return None
+        elif self._sqlite is not None:
+            try:
+                with self._lock:
+                    row = self._sqlite.execute(
+                        "SELECT payload FROM tool_cache WHERE key = ? AND expires_at > ?",
+                        (self._entry_key(tool_name, args_key), time.time()),
+                    ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("⚠️  Tool cache unavailable: %s", e)
+                return None
+            cached = row[0] if row is not None else None
+        else:
+            with self._lock:
+                return self._local.get((tool_name, args_key))
+
+        if cached is None:
+            return None
+        fresh_until, result = orjson.loads(cached)
+        return fresh_until, result
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a fresh cached result
+
+        Args:
+            tool_name: Name of the tool
+            arguments: Arguments of the call
+
+        Returns:
+            The cached result, or None on a miss or for uncached tools
+        """
+        if tool_name not in TOOL_CACHE_TTLS:
+            return None
+        entry = self._lookup(tool_name, arguments)
+        if entry is None or time.time() >= entry[0]:
+            return None
+        return entry[1]
+
+    def get_stale(
+        self, tool_name: str, arguments: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a result that may be past its TTL, to stand in for a failed call
+
+        Args:
+            tool_name: Name of the tool
+            arguments: Arguments of the call
+
+        Returns:
+            The last result within the tool's stale window, or None
+        """
+        if tool_name not in TOOL_STALE_TTLS:
+            return None
+        entry = self._lookup(tool_name, arguments)
+        if entry is None or "error" in entry[1]:
+            return None
+        return entry[1]
+
+    def set(self, tool_name: str, arguments: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """
+        Store a result (failures and uncached tools are ignored)
+
+        Args:
+            tool_name: Name of the tool
+            arguments: Arguments of the call
+            result: Result returned by the tool
+        """
+        ttl = TOOL_CACHE_TTLS.get(tool_name)
+        if ttl is None:
+            return
+        if "error" in result:
+            # Only a definitive miss is worth remembering, never a failed request
+            ttl = TOOL_NEGATIVE_TTLS.get(tool_name)
+            if ttl is None or result.get("count") != 0:
+                return
+            keep = ttl
+        else:
+            keep = ttl + TOOL_STALE_TTLS.get(tool_name, 0)
+        args_key = canonical_args(tool_name, arguments)
+        now = time.time()
+        entry = (now + ttl, result)
+
+        if self._redis is not None:
+            try:
+                self._redis.setex(
+                    self._entry_key(tool_name, args_key), keep, orjson.dumps(entry)
+                )
+            except redis.RedisError as e:
+                logger.warning("⚠️  Tool cache unavailable: %s", e)
+        elif self._sqlite is not None:
+            try:
+                with self._lock:
+                    self._sqlite.execute(
+                        "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?)",
+                        (
+                            self._entry_key(tool_name, args_key),
+                            orjson.dumps(entry),
+                            now + keep,
+                        ),
+                    )
+                    # Expired rows are skipped on read but only removed here,
+                    # so a long-running process doesn't grow the file forever
+                    self._sqlite_writes += 1
+                    if self._sqlite_writes >= SQLITE_PRUNE_INTERVAL:
+                        self._sqlite_writes = 0
+                        self._sqlite.execute(
+                            "DELETE FROM tool_cache WHERE expires_at <= ?", (now,)
+                        )
+            except sqlite3.Error as e:
+                logger.warning("⚠️  Tool cache unavailable: %s", e)
+        else:
+            with self._lock:
+                self._local[(tool_name, args_key)] = entry
+
+
+class SingleFlight:
+    """
+    Coalesce identical calls running at the same time
+
+    The first caller for a key runs the function; callers arriving before
+    it finishes wait for and share its result instead of repeating the work.
+    """
+
+    def __init__(self):
+        """Initialize the table of calls in flight"""
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, or wait for the call already running under the same key
+
+        Args:
+            key: Identity of the call
+            fn: Function computing the result
+
+        Returns:
+            The result of fn (shared by every caller of the flight)
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+# Shared cache used by the tool registry
+_settings = get_settings()
+tool_cache = ToolResultCache(_settings.redis_url, _settings.tool_cache_path)
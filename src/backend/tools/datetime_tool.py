@@ -9,6 +9,9 @@ from zoneinfo import ZoneInfo
 
 logger = logging.getLogger(__name__)
 
+# Resolved once at import instead of on every call
+_MTL_TZ = ZoneInfo("America/Montreal")
+
 
 def get_current_datetime() -> Dict[str, Any]:
     """
@@ -20,20 +23,24 @@ def get_current_datetime() -> Dict[str, Any]:
     logger.debug("🕐 Getting current datetime for Montreal timezone")
     try:
         # Get current time in Montreal timezone
-        montreal_tz = ZoneInfo("America/Montreal")
-        now = datetime.now(montreal_tz)
+        now = datetime.now(_MTL_TZ)
+
+        # Date and time are slices of the ISO string ("YYYY-MM-DDTHH:MM:SS..."),
+        # and the day of week is the first field of the readable string
+        iso = now.isoformat()
+        readable = now.strftime("%A, %B %d, %Y at %I:%M %p")
 
         result = {
             "success": True,
-            "datetime": now.isoformat(),
-            "date": now.strftime("%Y-%m-%d"),
-            "time": now.strftime("%H:%M:%S"),
-            "day_of_week": now.strftime("%A"),
+            "datetime": iso,
+            "date": iso[:10],
+            "time": iso[11:19],
+            "day_of_week": readable[: readable.index(",")],
             "timezone": "America/Montreal",
-            "readable": now.strftime("%A, %B %d, %Y at %I:%M %p"),
+            "readable": readable,
         }
-        logger.debug(f"✅ Current time: {result['readable']}")
+        logger.debug("✅ Current time: %s", result["readable"])
         return result
     except Exception as e:
-        logger.error(f"❌ Failed to get current datetime: {str(e)}")
+        logger.error("❌ Failed to get current datetime: %s", e)
         return {"success": False, "error": f"Failed to get current datetime: {str(e)}"}
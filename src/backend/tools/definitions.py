@@ -2,6 +2,8 @@
 Tool definitions for Mistral AI function calling
 """
 
+from .geocoding_tool import MAX_BATCH_QUERIES
+
 # Tool definitions for Mistral API
 TOOLS = [
     {
@@ -37,6 +39,29 @@ TOOLS = [
             },
         },
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "geocode_locations",
+            "description": "Convert several location names or addresses into geographic coordinates in a single call. Prefer this over geocode_location whenever 2 or more places are needed (e.g., both the origin and the destination of a trip). The same rules apply: NEVER guess coordinates, and add city name and 'Quebec' to each query.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "queries": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "maxItems": MAX_BATCH_QUERIES,
+                        "description": f"The location names or addresses to geocode (at most {MAX_BATCH_QUERIES}). Examples: ['McGill University, Montreal, Quebec', 'Carrefour Laval, Laval, Quebec']",
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of results to return per location (default: 1)",
+                    },
+                },
+                "required": ["queries"],
+            },
+        },
+    },
     {
         "type": "function",
         "function": {
@@ -62,7 +87,7 @@ TOOLS = [
         "type": "function",
         "function": {
             "name": "plan_trip",
-            "description": "Plan a trip from one location to another using various modes of transportation (transit, walking, biking, driving). Returns detailed itineraries with step-by-step directions. IMPORTANT: Coordinates must be obtained using geocode_location tool first - do NOT use hardcoded coordinates for destinations.",
+            "description": "Plan a trip from one location to another using various modes of transportation (transit, walking, biking, driving). Returns detailed itineraries with step-by-step directions. IMPORTANT: Coordinates must be obtained using geocode_location (or geocode_locations for several places) first - do NOT use hardcoded coordinates for destinations.",
             "parameters": {
                 "type": "object",
                 "properties": {
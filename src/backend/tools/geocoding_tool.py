@@ -4,12 +4,17 @@ Geocoding tool using Photon (OpenStreetMap) geocoder
 
 import requests
 import logging
+import orjson
 from typing import Any, Dict
 
 from config import get_settings
+from .http_client import http_session
 
 logger = logging.getLogger(__name__)
 
+# Most places geocode_locations looks up in one call
+MAX_BATCH_QUERIES = 5
+
 
 def geocode_location(query: str, limit: int = 1) -> Dict[str, Any]:
     """
@@ -22,13 +27,13 @@ def geocode_location(query: str, limit: int = 1) -> Dict[str, Any]:
     Returns:
         Dictionary with geocoding results containing coordinates and location info
     """
-    logger.debug(f"📍 Geocoding location: '{query}' (limit={limit})")
+    logger.debug("📍 Geocoding location: '%s' (limit=%s)", query, limit)
     try:
         # Get Photon URL from settings
         settings = get_settings()
         photon_url = settings.photon_url
         api_endpoint = f"{photon_url}/api"
-        logger.debug(f"Using Photon API endpoint: {api_endpoint}")
+        logger.debug("Using Photon API endpoint: %s", api_endpoint)
 
         # Request parameters
         params = {
@@ -36,20 +41,21 @@ def geocode_location(query: str, limit: int = 1) -> Dict[str, Any]:
             "limit": min(limit, 5),  # Cap at 5 results
         }
 
-        response = requests.get(api_endpoint, params=params, timeout=10)
+        response = http_session.get(api_endpoint, params=params, timeout=10)
         response.raise_for_status()
 
-        data = response.json()
+        data = orjson.loads(response.content)
 
         # Extract features
         features = data.get("features", [])
 
         if not features:
-            logger.warning(f"⚠️  No geocoding results found for '{query}'")
+            logger.warning("⚠️  No geocoding results found for '%s'", query)
             return {
                 "success": False,
                 "error": f"No results found for '{query}'",
                 "query": query,
+                "count": 0,
             }
 
         # Format results
@@ -73,10 +79,14 @@ def geocode_location(query: str, limit: int = 1) -> Dict[str, Any]:
                 }
                 results.append(result)
 
-        logger.debug(f"✅ Found {len(results)} location(s) for '{query}'")
-        if results:
+        logger.debug("✅ Found %d location(s) for '%s'", len(results), query)
+        if results and logger.isEnabledFor(logging.DEBUG):
+            first = results[0]
             logger.debug(
-                f"First result: {results[0]['name']} at ({results[0]['latitude']}, {results[0]['longitude']})"
+                "First result: %s at (%s, %s)",
+                first["name"],
+                first["latitude"],
+                first["longitude"],
             )
 
         return {
@@ -87,21 +97,21 @@ def geocode_location(query: str, limit: int = 1) -> Dict[str, Any]:
         }
 
     except requests.exceptions.ConnectionError:
-        logger.error(f"❌ Cannot connect to Photon geocoder at {photon_url}")
+        logger.error("❌ Cannot connect to Photon geocoder at %s", photon_url)
         return {
             "success": False,
             "error": f"Cannot connect to Photon geocoder at {photon_url}. Make sure it's running.",
             "query": query,
         }
     except requests.exceptions.Timeout:
-        logger.error(f"❌ Geocoding request timed out for '{query}'")
+        logger.error("❌ Geocoding request timed out for '%s'", query)
         return {
             "success": False,
             "error": "Geocoding request timed out",
             "query": query,
         }
     except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Geocoding request failed: {str(e)}")
+        logger.error("❌ Geocoding request failed: %s", e)
         return {
             "success": False,
             "error": f"Failed to geocode location: {str(e)}",
@@ -109,7 +119,7 @@ def geocode_location(query: str, limit: int = 1) -> Dict[str, Any]:
         }
     except Exception as e:
         logger.error(
-            f"❌ Unexpected error in geocode_location: {str(e)}", exc_info=True
+            "❌ Unexpected error in geocode_location: %s", e, exc_info=True
         )
         return {
             "success": False,
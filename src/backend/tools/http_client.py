@@ -0,0 +1,65 @@
+"""
+Shared HTTP session for the tools
+"""
+
+import atexit
+import logging
+from typing import Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+def _create_session() -> requests.Session:
+    """
+    Create a session keeping connections to each service alive between calls
+
+    Returns:
+        requests.Session with pooled, retrying adapters for http and https
+    """
+    session = requests.Session()
+    # Identify the app to Open-Meteo, OTP, Photon and STM once for every request
+    session.headers["User-Agent"] = "mtl-finder-backend/0.1.0"
+    # One pool per host (Open-Meteo, OTP, Photon, STM), several connections
+    # each since tools of a round run concurrently in worker threads
+    # Retry failed connects (nothing was sent yet) and, for idempotent methods
+    # only, one dropped/timed-out read such as a keep-alive closed by the server
+    # or a gateway error from a service restarting
+    retries = Retry(
+        total=2,
+        connect=2,
+        read=1,
+        backoff_factor=0.1,
+        status_forcelist=(502, 503, 504),
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Reused by every tool call (requests.Session is safe to share for plain requests)
+http_session = _create_session()
+atexit.register(http_session.close)
+
+
+def warm_up(urls: Iterable[str], timeout: float = 2) -> None:
+    """
+    Open a pooled connection to each service ahead of the first tool call
+
+    A HEAD request pays the TCP (and TLS) handshake up front; any response,
+    even an error status, leaves the connection in the pool. Unreachable
+    services are skipped.
+
+    Args:
+        urls: One URL per service to connect to
+        timeout: Timeout in seconds for each request
+    """
+    for url in urls:
+        try:
+            http_session.head(url, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            logger.debug("Connection warm-up failed for %s: %s", url, e)
@@ -3,25 +3,72 @@ Function registry for tool execution
 """
 
 import logging
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
 
+from config import get_settings
+from .cache import SingleFlight, canonical_args, tool_cache
 from .datetime_tool import get_current_datetime
-from .geocoding_tool import geocode_location
-from .weather_tool import get_weather
+from .geocoding_tool import MAX_BATCH_QUERIES, geocode_location
+from .http_client import warm_up
+from .weather_tool import WEATHER_URL, get_weather
 from .routing_tool import plan_trip
-from .transit_tool import get_stm_alerts
+from .transit_tool import STM_ALERTS_URL, get_stm_alerts
+from .validation import coerce_numbers, drop_unknown_arguments, validate_arguments
 
 logger = logging.getLogger(__name__)
 
+# Lookups of a batch geocode run side by side
+_geocode_pool = ThreadPoolExecutor(
+    max_workers=MAX_BATCH_QUERIES, thread_name_prefix="geocode"
+)
+
+
+def geocode_locations(queries: List[str], limit: int = 1) -> Dict[str, Any]:
+    """
+    Geocode several places at once, e.g. the origin and destination of a trip
+
+    Args:
+        queries: Location names or addresses to geocode
+        limit: Maximum number of results per location (default: 1)
+
+    Returns:
+        Dictionary with one geocode_location result per query, in query order
+    """
+    # Spelling variants of the same place are looked up once
+    keys = [" ".join(str(query).split()).casefold() for query in queries]
+    unique: Dict[str, str] = {}
+    for key, query in zip(keys, queries):
+        unique.setdefault(key, query)
+
+    # Each lookup goes through execute_tool, so it is cached and coalesced
+    # like a single geocode_location call
+    lookups = {
+        key: _geocode_pool.submit(
+            execute_tool, "geocode_location", {"query": query, "limit": limit}
+        )
+        for key, query in unique.items()
+    }
+    results = [lookups[key].result() for key in keys]
+    logger.debug(
+        "✅ Geocoded %d location(s) in %d lookup(s)", len(results), len(lookups)
+    )
+    return {"success": True, "count": len(results), "results": results}
+
+
 # Function registry - maps function names to actual Python functions
 FUNCTION_REGISTRY = {
     "get_current_datetime": get_current_datetime,
     "geocode_location": geocode_location,
+    "geocode_locations": geocode_locations,
     "get_weather": get_weather,
     "plan_trip": plan_trip,
     "get_stm_alerts": get_stm_alerts,
 }
 
+# Calls in flight, shared by identical concurrent calls
+_single_flight = SingleFlight()
+
 
 def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -32,17 +79,71 @@ def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         arguments: Dictionary of arguments to pass to the tool
 
     Returns:
-        Result from the tool execution
+        Result from the tool execution (served from the tool cache when fresh)
     """
-    if tool_name not in FUNCTION_REGISTRY:
-        logger.error(f"❌ Unknown tool requested: {tool_name}")
+    func = FUNCTION_REGISTRY.get(tool_name)
+    if func is None:
+        logger.error("❌ Unknown tool requested: %s", tool_name)
         return {"error": f"Unknown tool: {tool_name}"}
 
+    # Arguments the model got wrong would only come back as an HTTP error
+    arguments = drop_unknown_arguments(tool_name, arguments)
+    invalid = validate_arguments(tool_name, arguments)
+    if invalid is not None:
+        logger.warning("⚠️  Invalid arguments for %s: %s", tool_name, invalid)
+        return {"error": f"Invalid arguments for {tool_name}: {invalid}"}
+    arguments = coerce_numbers(tool_name, arguments)
+
+    cached = tool_cache.get(tool_name, arguments)
+    if cached is not None:
+        logger.debug("Tool cache hit: %s", tool_name)
+        return cached
+
+    # Identical calls already running (e.g. two users asking about the same
+    # landmark) share one request instead of each hitting the service
+    return _single_flight.run(
+        (tool_name, canonical_args(tool_name, arguments)),
+        lambda: _run_tool(func, tool_name, arguments),
+    )
+
+
+def _run_tool(
+    func: Callable[..., Dict[str, Any]], tool_name: str, arguments: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Call a tool and record its result in the tool cache
+
+    Args:
+        func: Tool function
+        tool_name: Name of the tool
+        arguments: Validated arguments of the call
+
+    Returns:
+        Result of the tool, or its last good result if it failed and one is kept
+    """
+    # Tools report their own failures as {"error": ...}; arguments are checked
+    # against the schema first, so this only guards against schema/signature drift
+    logger.debug("Executing tool: %s", tool_name)
     try:
-        logger.debug(f"Executing tool: {tool_name}")
-        func = FUNCTION_REGISTRY[tool_name]
         result = func(**arguments)
-        return result
-    except Exception as e:
-        logger.error(f"❌ Error executing {tool_name}: {str(e)}", exc_info=True)
-        return {"error": f"Error executing {tool_name}: {str(e)}"}
+    except TypeError as e:
+        logger.error("❌ Invalid arguments for %s: %s", tool_name, e)
+        return {"error": f"Invalid arguments for {tool_name}: {str(e)}"}
+
+    if "error" in result:
+        # Serve the last good result, marked as such, if the tool keeps one
+        stale = tool_cache.get_stale(tool_name, arguments)
+        if stale is not None:
+            logger.warning("⚠️  %s failed, serving previous result", tool_name)
+            return {**stale, "stale": True}
+
+    tool_cache.set(tool_name, arguments, result)
+    return result
+
+
+def warm_up_connections() -> None:
+    """Connect to every service the tools call (blocking, run it in a thread)"""
+    settings = get_settings()
+    urls: List[str] = [WEATHER_URL, STM_ALERTS_URL, settings.otp_url, settings.photon_url]
+    warm_up(urls)
+    logger.debug("Tool connections warmed up")
@@ -4,14 +4,110 @@ Trip planning tool using OpenTripPlanner GraphQL API
 
 import requests
 import logging
-from typing import Any, Dict, Optional
+import orjson
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
 from config import get_settings
+from .http_client import http_session
 
 logger = logging.getLogger(__name__)
 
+# Leg times are shown in local time; resolved once at import
+_MTL_TZ = ZoneInfo("America/Montreal")
+
+# Shared read-only default for missing nested objects (never mutated)
+_EMPTY: Dict[str, Any] = {}
+
+# The body is pre-serialized with orjson (data=), so requests doesn't set this itself
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# GraphQL TransportMode inputs
+_WALK = {"mode": "WALK"}
+_TRANSIT = {"mode": "TRANSIT"}
+_BIXI = {"mode": "BICYCLE", "qualifier": "RENT"}  # Bike-share
+
+# All modes: transit (bus, metro, REM), walk, and BIXI ("ALL", "TRANSIT_BIXI", or default)
+_ALL_MODES = [_WALK, _TRANSIT, _BIXI]
+
+_TRANSPORT_MODES = {
+    "WALK": [_WALK],
+    # BIXI only (bike-share with walk to/from stations)
+    "BICYCLE": [_BIXI, _WALK],
+    # Transit + walk (no BIXI)
+    "TRANSIT": [_WALK, _TRANSIT],
+    # Metro/REM only (no buses), with walk and BIXI
+    "NO_BUS": [_WALK, {"mode": "RAIL"}, {"mode": "SUBWAY"}, _BIXI],
+    # Bus only (no metro/REM), with walk and BIXI
+    "NO_METRO": [_WALK, {"mode": "BUS"}, _BIXI],
+}
+
+# Static query document: per-trip values are sent as variables, so the text
+# never changes and OTP can reuse its parsed form
+_PLAN_QUERY = """
+query Plan(
+  $from: InputCoordinates!
+  $to: InputCoordinates!
+  $transportModes: [TransportMode]
+  $date: String!
+  $arriveBy: Boolean!
+) {
+  plan(
+    from: $from
+    to: $to
+    transportModes: $transportModes
+    numItineraries: 5
+    date: $date
+    arriveBy: $arriveBy
+  ) {
+    itineraries {
+      startTime
+      endTime
+      duration
+      walkDistance
+      legs {
+        mode
+        startTime
+        endTime
+        duration
+        distance
+        rentedBike
+        from {
+          name
+          lat
+          lon
+          bikeRentalStation {
+            stationId
+            name
+            bikesAvailable
+            spacesAvailable
+          }
+        }
+        to {
+          name
+          lat
+          lon
+          bikeRentalStation {
+            stationId
+            name
+            bikesAvailable
+            spacesAvailable
+          }
+        }
+        route {
+          shortName
+          longName
+        }
+        trip {
+          tripHeadsign
+        }
+      }
+    }
+  }
+}
+"""
+
 
 def plan_trip(
     from_lat: float,
@@ -47,56 +143,55 @@ def plan_trip(
         Dictionary with trip itineraries including BIXI options
     """
     logger.info(
-        f"🚌 Planning trip: ({from_lat}, {from_lon}) -> ({to_lat}, {to_lon}) [mode={mode}]"
+        "🚌 Planning trip: (%s, %s) -> (%s, %s) [mode=%s]",
+        from_lat,
+        from_lon,
+        to_lat,
+        to_lon,
+        mode,
     )
     try:
+        # ~10 m is far below stop spacing: nearby requests send the same query,
+        # matching the plan_trip cache key (see tools/cache.py)
+        from_lat, from_lon = round(float(from_lat), 4), round(float(from_lon), 4)
+        to_lat, to_lon = round(float(to_lat), 4), round(float(to_lon), 4)
+
         # Get OTP URL from settings
         settings = get_settings()
         otp_url = settings.otp_url
 
-        # Format time for GraphQL (use current time if not provided)
-        if time:
-            try:
-                dt: datetime = datetime.fromisoformat(time.replace("Z", "+00:00"))
-            except ValueError:
-                dt = datetime.now()
-        else:
-            dt = datetime.now()
-
-        # Format as ISO 8601 string for GraphQL
-        time_str = dt.strftime("%Y-%m-%dT%H:%M:%S")
-
-        # Build transportModes based on requested mode
-        transport_modes_str = _build_transport_modes(mode)
-
-        # Build GraphQL query
-        query = _build_graphql_query(
-            from_lat=from_lat,
-            from_lon=from_lon,
-            to_lat=to_lat,
-            to_lon=to_lon,
-            transport_modes_str=transport_modes_str,
-            time_str=time_str,
-            arrive_by=arrive_by,
-        )
-
-        payload = {"query": query}
+        # Format time for GraphQL (use current time if not provided or invalid),
+        # bucketed to the minute so requests made within the same minute share
+        # the tool cache entry (see tools/cache.py)
+        time_str = trip_time(time) or _minute(datetime.now())
+
+        # Build GraphQL request (static query + variables)
+        payload = {
+            "query": _PLAN_QUERY,
+            "variables": {
+                "from": {"lat": from_lat, "lon": from_lon},
+                "to": {"lat": to_lat, "lon": to_lon},
+                "transportModes": _build_transport_modes(mode),
+                "date": time_str,
+                "arriveBy": arrive_by,
+            },
+        }
 
-        logger.debug(f"Sending GraphQL request to OTP at {otp_url}")
-        response = requests.post(
+        logger.debug("Sending GraphQL request to OTP at %s", otp_url)
+        response = http_session.post(
             otp_url,
-            json=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=30,
+            data=orjson.dumps(payload),
+            headers=_JSON_HEADERS,
+            timeout=10,
         )
         response.raise_for_status()
 
-        data = response.json()
+        data = orjson.loads(response.content)
 
         # Check for GraphQL errors
         if "errors" in data:
             error_msg = data["errors"][0].get("message", "Unknown error")
-            logger.error(f"❌ OTP GraphQL error: {error_msg}")
+            logger.error("❌ OTP GraphQL error: %s", error_msg)
             return {"error": f"GraphQL error: {error_msg}"}
 
         # Extract itineraries
@@ -107,83 +202,23 @@ def plan_trip(
 
         itineraries = []
         for itinerary in plan["itineraries"]:
-            legs = []
-            for leg in itinerary.get("legs", []):
-                # Convert timestamps from epoch milliseconds to readable format
-                start_time_ms = leg.get("startTime")
-                end_time_ms = leg.get("endTime")
-
-                # Convert to datetime objects and format as readable strings
-                start_time_readable = None
-                end_time_readable = None
-                if start_time_ms:
-                    start_dt = datetime.fromtimestamp(
-                        start_time_ms / 1000, tz=ZoneInfo("America/Montreal")
-                    )
-                    start_time_readable = start_dt.strftime("%H:%M")  # e.g., "14:35"
-                if end_time_ms:
-                    end_dt = datetime.fromtimestamp(
-                        end_time_ms / 1000, tz=ZoneInfo("America/Montreal")
-                    )
-                    end_time_readable = end_dt.strftime("%H:%M")
-
-                # Extract BIXI station info if available
-                from_station = leg.get("from", {}).get("bikeRentalStation")
-                to_station = leg.get("to", {}).get("bikeRentalStation")
-
-                leg_info = {
-                    "mode": leg.get("mode"),
-                    "from": leg.get("from", {}).get("name"),
-                    "to": leg.get("to", {}).get("name"),
-                    "distance": round(leg.get("distance", 0), 2),
-                    "duration": leg.get("duration", 0),
-                    "duration_minutes": round(leg.get("duration", 0) / 60, 1),
-                    "startTime": start_time_readable,  # Now in HH:MM format
-                    "endTime": end_time_readable,  # Now in HH:MM format
-                    "route": leg.get("route", {}).get("shortName")
-                    if leg.get("route")
-                    else None,
-                    "routeLongName": leg.get("route", {}).get("longName")
-                    if leg.get("route")
-                    else None,
-                    "headsign": leg.get("trip", {}).get("tripHeadsign")
-                    if leg.get("trip")
-                    else None,
-                    "rentedBike": leg.get("rentedBike", False),
+            duration = itinerary.get("duration", 0)
+            itineraries.append(
+                {
+                    "duration": duration,
+                    "duration_minutes": round(duration / 60, 1),
+                    "walkDistance": round(itinerary.get("walkDistance", 0), 2),
+                    "transfers": itinerary.get("transfers", 0),
+                    "startTime": itinerary.get("startTime"),
+                    "endTime": itinerary.get("endTime"),
+                    "legs": [_parse_leg(leg) for leg in itinerary.get("legs", ())],
                 }
+            )
 
-                # Add BIXI station info if this leg involves bike rental
-                if from_station:
-                    leg_info["fromBixiStation"] = {
-                        "stationId": from_station.get("stationId"),
-                        "name": from_station.get("name"),
-                        "bikesAvailable": from_station.get("bikesAvailable"),
-                        "spacesAvailable": from_station.get("spacesAvailable"),
-                    }
-
-                if to_station:
-                    leg_info["toBixiStation"] = {
-                        "stationId": to_station.get("stationId"),
-                        "name": to_station.get("name"),
-                        "bikesAvailable": to_station.get("bikesAvailable"),
-                        "spacesAvailable": to_station.get("spacesAvailable"),
-                    }
-                legs.append(leg_info)
-
-            itinerary_info = {
-                "duration": itinerary.get("duration", 0),
-                "duration_minutes": round(itinerary.get("duration", 0) / 60, 1),
-                "walkDistance": round(itinerary.get("walkDistance", 0), 2),
-                "transfers": itinerary.get("transfers", 0),
-                "startTime": itinerary.get("startTime"),
-                "endTime": itinerary.get("endTime"),
-                "legs": legs,
-            }
-            itineraries.append(itinerary_info)
-
-        logger.debug(f"✅ Found {len(itineraries)} itinerary option(s)")
-        durations = [f"{it['duration_minutes']} min" for it in itineraries]
-        logger.debug(f"Trip durations: {durations}")
+        logger.debug("✅ Found %d itinerary option(s)", len(itineraries))
+        if logger.isEnabledFor(logging.DEBUG):
+            durations = [f"{it['duration_minutes']} min" for it in itineraries]
+            logger.debug("Trip durations: %s", durations)
 
         return {
             "success": True,
@@ -195,7 +230,7 @@ def plan_trip(
 
     except requests.exceptions.ConnectionError:
         settings = get_settings()
-        logger.error(f"❌ Cannot connect to OpenTripPlanner at {settings.otp_url}")
+        logger.error("❌ Cannot connect to OpenTripPlanner at %s", settings.otp_url)
         return {
             "error": f"Cannot connect to OpenTripPlanner. Make sure it's running at {settings.otp_url}"
         }
@@ -203,136 +238,115 @@ def plan_trip(
         logger.error("❌ Request to OpenTripPlanner timed out")
         return {"error": "Request to OpenTripPlanner timed out"}
     except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Failed to fetch route data: {str(e)}")
+        logger.error("❌ Failed to fetch route data: %s", e)
         return {"error": f"Failed to fetch route data: {str(e)}"}
     except Exception as e:
-        logger.error(f"❌ Unexpected error in plan_trip: {str(e)}", exc_info=True)
+        logger.error("❌ Unexpected error in plan_trip: %s", e, exc_info=True)
         return {"error": f"Unexpected error: {str(e)}"}
 
 
-def _build_transport_modes(mode: str) -> str:
+def trip_time(requested_time: Optional[str]) -> Optional[str]:
     """
-    Build the transportModes array string based on the requested mode.
+    Normalize a requested trip time to the local minute sent to OTP
 
     Args:
-        mode: Transportation mode preference
+        requested_time: Time in ISO format, with or without a UTC offset
 
     Returns:
-        Comma-separated string of transport mode objects for GraphQL
+        Montreal local time cut to the minute ("YYYY-MM-DDTHH:MM:00"),
+        or None if no valid time was given (plan for now)
     """
-    mode = mode.upper()
-
-    if mode == "WALK":
-        transport_modes = ["{mode: WALK}"]
-    elif mode == "BICYCLE":
-        # BIXI only (bike-share with walk to/from stations)
-        transport_modes = ["{mode: BICYCLE, qualifier: RENT}", "{mode: WALK}"]
-    elif mode == "TRANSIT":
-        # Transit + walk (no BIXI)
-        transport_modes = ["{mode: WALK}", "{mode: TRANSIT}"]
-    elif mode == "NO_BUS":
-        # Metro/REM only (no buses), with walk and BIXI
-        transport_modes = [
-            "{mode: WALK}",
-            "{mode: RAIL}",  # Metro and REM
-            "{mode: SUBWAY}",  # Metro specifically
-            "{mode: BICYCLE, qualifier: RENT}",
-        ]
-    elif mode == "NO_METRO":
-        # Bus only (no metro/REM), with walk and BIXI
-        transport_modes = [
-            "{mode: WALK}",
-            "{mode: BUS}",
-            "{mode: BICYCLE, qualifier: RENT}",
-        ]
-    else:  # "ALL", "TRANSIT_BIXI", or default
-        # All modes: transit (bus, metro, REM), walk, and BIXI
-        transport_modes = [
-            "{mode: WALK}",
-            "{mode: TRANSIT}",
-            "{mode: BICYCLE, qualifier: RENT}",
-        ]
-
-    return ", ".join(transport_modes)
-
-
-def _build_graphql_query(
-    from_lat: float,
-    from_lon: float,
-    to_lat: float,
-    to_lon: float,
-    transport_modes_str: str,
-    time_str: str,
-    arrive_by: bool,
-) -> str:
+    if not requested_time:
+        return None
+    try:
+        dt = datetime.fromisoformat(requested_time.replace("Z", "+00:00"))
+        # OTP reads offset-less times in the Montreal timezone
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(_MTL_TZ)
+    except (ValueError, OverflowError):
+        return None  # Also out of range once converted (e.g. 9999-12-31T23:59-05:00)
+    return _minute(dt)
+
+
+def _minute(dt: datetime) -> str:
+    """Format a datetime as a local ISO 8601 string cut to the minute"""
+    return dt.replace(second=0, microsecond=0, tzinfo=None).isoformat(timespec="seconds")
+
+
+def _build_transport_modes(mode: str) -> List[Dict[str, str]]:
     """
-    Build the GraphQL query for trip planning.
+    Get the transportModes variable for the requested mode.
 
     Args:
-        from_lat: Starting latitude
-        from_lon: Starting longitude
-        to_lat: Destination latitude
-        to_lon: Destination longitude
-        transport_modes_str: Comma-separated transport modes string
-        time_str: ISO datetime string
-        arrive_by: Whether time is arrival time
+        mode: Transportation mode preference
 
     Returns:
-        Formatted GraphQL query string
+        List of TransportMode inputs for GraphQL (shared constants, not copied)
+    """
+    return _TRANSPORT_MODES.get(mode.upper(), _ALL_MODES)
+
+
+def _parse_leg(leg: Dict[str, Any]) -> Dict[str, Any]:
     """
-    return f"""
-    {{
-      plan(
-        from: {{lat: {from_lat}, lon: {from_lon}}}
-        to: {{lat: {to_lat}, lon: {to_lon}}}
-        transportModes: [{transport_modes_str}]
-        numItineraries: 5
-        date: "{time_str}"
-        arriveBy: {"true" if arrive_by else "false"}
-      ) {{
-        itineraries {{
-          startTime
-          endTime
-          duration
-          walkDistance
-          legs {{
-            mode
-            startTime
-            endTime
-            duration
-            distance
-            rentedBike
-            from {{
-              name
-              lat
-              lon
-              bikeRentalStation {{
-                stationId
-                name
-                bikesAvailable
-                spacesAvailable
-              }}
-            }}
-            to {{
-              name
-              lat
-              lon
-              bikeRentalStation {{
-                stationId
-                name
-                bikesAvailable
-                spacesAvailable
-              }}
-            }}
-            route {{
-              shortName
-              longName
-            }}
-            trip {{
-              tripHeadsign
-            }}
-          }}
-        }}
-      }}
-    }}
+    Convert one OTP leg into the summary returned to the model
+
+    Args:
+        leg: Leg object from the OTP response
+
+    Returns:
+        Leg summary with readable times and BIXI station info when relevant
     """
+    # Bind nested objects once (OTP returns null for missing ones)
+    leg_from = leg.get("from") or _EMPTY
+    leg_to = leg.get("to") or _EMPTY
+    route = leg.get("route") or _EMPTY
+    trip = leg.get("trip") or _EMPTY
+    duration = leg.get("duration", 0)
+
+    # Convert timestamps from epoch milliseconds to readable format
+    start_time_ms = leg.get("startTime")
+    end_time_ms = leg.get("endTime")
+
+    # Convert to datetime objects and format as readable strings
+    start_time_readable = None
+    end_time_readable = None
+    if start_time_ms:
+        start_dt = datetime.fromtimestamp(start_time_ms / 1000, tz=_MTL_TZ)
+        start_time_readable = start_dt.strftime("%H:%M")  # e.g., "14:35"
+    if end_time_ms:
+        end_dt = datetime.fromtimestamp(end_time_ms / 1000, tz=_MTL_TZ)
+        end_time_readable = end_dt.strftime("%H:%M")
+
+    leg_info = {
+        "mode": leg.get("mode"),
+        "from": leg_from.get("name"),
+        "to": leg_to.get("name"),
+        "distance": round(leg.get("distance", 0), 2),
+        "duration": duration,
+        "duration_minutes": round(duration / 60, 1),
+        "startTime": start_time_readable,  # Now in HH:MM format
+        "endTime": end_time_readable,  # Now in HH:MM format
+        "route": route.get("shortName"),
+        "routeLongName": route.get("longName"),
+        "headsign": trip.get("tripHeadsign"),
+        "rentedBike": leg.get("rentedBike", False),
+    }
+
+    # Add BIXI station info if this leg involves bike rental
+    from_station = leg_from.get("bikeRentalStation")
+    if from_station:
+        leg_info["fromBixiStation"] = _parse_bixi_station(from_station)
+    to_station = leg_to.get("bikeRentalStation")
+    if to_station:
+        leg_info["toBixiStation"] = _parse_bixi_station(to_station)
+    return leg_info
+
+
+def _parse_bixi_station(station: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the BIXI station fields returned to the model"""
+    return {
+        "stationId": station.get("stationId"),
+        "name": station.get("name"),
+        "bikesAvailable": station.get("bikesAvailable"),
+        "spacesAvailable": station.get("spacesAvailable"),
+    }
@@ -4,13 +4,47 @@ STM transit alerts tool using GTFS-RT
 
 import requests
 import logging
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from google.protobuf.internal import api_implementation
+from google.protobuf.message import DecodeError
 from google.transit import gtfs_realtime_pb2  # type: ignore[import-untyped]
 
 from config import get_settings
+from .http_client import http_session
 
 logger = logging.getLogger(__name__)
 
+# protobuf >= 4.21 parses with its native upb backend; the pure-Python fallback
+# (no wheel for the platform, or forced through PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION)
+# is orders of magnitude slower on the multi-MB trip updates feed
+if api_implementation.Type() == "python":
+    logger.warning("⚠️  protobuf uses its pure-Python backend, STM feed parsing will be slow")
+
+# STM GTFS-RT Trip Updates endpoint (contains delay/alert information)
+# Note: serviceAlerts endpoint is not available, we extract delays from tripUpdates
+STM_ALERTS_URL = "https://api.stm.info/pub/od/gtfs-rt/ic/v2/tripUpdates"
+
+# Route ids of the metro lines (green, orange, yellow, blue); other routes are buses
+_METRO_ROUTE_IDS = frozenset({"1", "2", "4", "5"})
+
+# Seconds the parsed feed is reused, and how old it may be when served as a
+# fallback while the STM API is unreachable
+ALERTS_TTL = 60
+ALERTS_STALE_TTL = 600
+
+# Seconds between background refreshes of the feed (see run_alerts_refresh)
+ALERTS_REFRESH_INTERVAL = 30
+
+# When get_stm_alerts was last called (monotonic); the background refresh only
+# runs while alerts were requested within ALERTS_STALE_TTL
+_last_requested: Optional[float] = None
+
+# Latest parsed feed, shared by all filters: (fetched_at, alerts for all routes)
+_latest_alerts: Optional[Tuple[float, List[Dict[str, Any]]]] = None
+_latest_lock = threading.Lock()
+
 
 def get_stm_alerts(route_type: str = "all") -> Dict[str, Any]:
     """
@@ -22,7 +56,9 @@ def get_stm_alerts(route_type: str = "all") -> Dict[str, Any]:
     Returns:
         Dictionary with current alerts and disruptions
     """
-    logger.debug(f"🚨 Getting STM alerts (filter: {route_type})")
+    global _last_requested
+    logger.debug("🚨 Getting STM alerts (filter: %s)", route_type)
+    _last_requested = time.monotonic()
     try:
         # Get API key from settings
         settings = get_settings()
@@ -34,105 +70,164 @@ def get_stm_alerts(route_type: str = "all") -> Dict[str, Any]:
                 "error": "STM_API_KEY not set. Get your API key at: https://portail.developpeurs.stm.info/apihub"
             }
 
-        # STM GTFS-RT Trip Updates endpoint (contains delay/alert information)
-        # Note: serviceAlerts endpoint is not available, we extract delays from tripUpdates
-        alerts_url = "https://api.stm.info/pub/od/gtfs-rt/ic/v2/tripUpdates"
-
-        headers = {"apikey": api_key}
-
-        logger.debug(f"Fetching STM GTFS-RT data from {alerts_url}")
-        response = requests.get(alerts_url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # Parse GTFS-RT protobuf data
-        feed = gtfs_realtime_pb2.FeedMessage()
-        feed.ParseFromString(response.content)
-        logger.debug(f"Parsed {len(feed.entity)} GTFS-RT entities")
-
-        # Extract delays from trip updates
-        delays = {}  # route_id -> list of delays
-
-        for entity in feed.entity:
-            if entity.HasField("trip_update"):
-                trip_update = entity.trip_update
-
-                if trip_update.HasField("trip") and trip_update.trip.HasField(
-                    "route_id"
-                ):
-                    route_id = trip_update.trip.route_id
-
-                    # Check for delays in stop_time_updates
-                    for stop_update in trip_update.stop_time_update:
-                        if stop_update.HasField(
-                            "arrival"
-                        ) and stop_update.arrival.HasField("delay"):
-                            delay_seconds = stop_update.arrival.delay
-
-                            # Only report significant delays (> 2 minutes)
-                            if abs(delay_seconds) > 120:
-                                if route_id not in delays:
-                                    delays[route_id] = []
-                                delays[route_id].append(delay_seconds)
-
-        # Convert delays to alerts
-        alerts = []
-        for route_id, delay_list in delays.items():
-            # Determine route type
-            route_types = set()
-            if route_id in ["1", "2", "4", "5"]:
-                route_types.add("metro")
+        with _latest_lock:
+            latest = _latest_alerts
+        now = time.monotonic()
+        stale = False
+        if latest is not None and now - latest[0] < ALERTS_TTL:
+            all_alerts = latest[1]
+        else:
+            try:
+                all_alerts = _fetch_alerts(api_key)
+            except requests.exceptions.RequestException as e:
+                if latest is None or now - latest[0] >= ALERTS_STALE_TTL:
+                    raise
+                logger.warning("⚠️  STM API unavailable, serving previous alerts: %s", e)
+                all_alerts, stale = latest[1], True
             else:
-                route_types.add("bus")
+                _store_alerts(now, all_alerts)
 
-            # Filter by route type
-            if route_type == "metro" and "metro" not in route_types:
-                continue
-            elif route_type == "bus" and "bus" not in route_types:
-                continue
+        # Filter by route type (the feed is fetched once for every filter)
+        route_kind = route_type.lower()
+        if route_kind in ("metro", "bus"):
+            alerts = [a for a in all_alerts if route_kind in a["route_types"]]
+        else:
+            alerts = all_alerts
 
-            # Calculate average delay
-            avg_delay = sum(delay_list) / len(delay_list)
-            max_delay = max(delay_list)
+        logger.debug("✅ Found %d STM alert(s) for %s", len(alerts), route_type)
+        if alerts and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Affected routes: %s", [a["affected_routes"] for a in alerts])
 
-            # Create alert message
-            delay_minutes = int(avg_delay / 60)
-            max_delay_minutes = int(max_delay / 60)
-
-            if avg_delay > 0:
-                header = f"Delays on route {route_id}"
-                description = f"Average delay: {delay_minutes} minutes (max: {max_delay_minutes} minutes)"
-            else:
-                header = f"Route {route_id} running ahead of schedule"
-                description = f"Average: {abs(delay_minutes)} minutes early"
-
-            alert_info = {
-                "id": f"delay_{route_id}",
-                "header": header,
-                "description": description,
-                "cause": "UNKNOWN_CAUSE",
-                "effect": "SIGNIFICANT_DELAYS" if avg_delay > 0 else "OTHER_EFFECT",
-                "affected_routes": [route_id],
-                "route_types": list(route_types),
-                "avg_delay_seconds": int(avg_delay),
-                "max_delay_seconds": int(max_delay),
-                "num_delayed_stops": len(delay_list),
-            }
-            alerts.append(alert_info)
-
-        logger.debug(f"✅ Found {len(alerts)} STM alert(s) for {route_type}")
-        if alerts:
-            logger.debug(f"Affected routes: {[a['affected_routes'] for a in alerts]}")
-
-        return {
+        result = {
             "success": True,
             "count": len(alerts),
             "alerts": alerts,
             "filter": route_type,
         }
+        if stale:
+            result["stale"] = True
+        return result
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Failed to fetch STM alerts: {str(e)}")
+        logger.error("❌ Failed to fetch STM alerts: %s", e)
         return {"error": f"Failed to fetch STM alerts: {str(e)}"}
     except Exception as e:
-        logger.error(f"❌ Unexpected error in get_stm_alerts: {str(e)}", exc_info=True)
+        logger.error("❌ Unexpected error in get_stm_alerts: %s", e, exc_info=True)
         return {"error": f"Unexpected error: {str(e)}"}
+
+
+def run_alerts_refresh(stop: threading.Event) -> None:
+    """
+    Keep the parsed feed fresh so calls never wait for the STM API (run in a thread)
+
+    Each worker runs its own refresh, so it pauses while no alerts were requested
+    in the last ALERTS_STALE_TTL seconds instead of spending STM API quota on
+    an idle worker; the first call after a pause fetches the feed itself.
+
+    Args:
+        stop: Event ending the refresh loop once set
+    """
+    api_key = get_settings().stm_api_key
+    if not api_key:
+        return
+
+    logger.info("🚨 Refreshing STM alerts every %ss while requested", ALERTS_REFRESH_INTERVAL)
+    while True:
+        last_requested = _last_requested
+        if (
+            last_requested is not None
+            and time.monotonic() - last_requested < ALERTS_STALE_TTL
+        ):
+            try:
+                _store_alerts(time.monotonic(), _fetch_alerts(api_key))
+            except (requests.exceptions.RequestException, DecodeError) as e:
+                # Calls fall back to fetching themselves, or to the stale feed
+                logger.warning("⚠️  STM alerts refresh failed: %s", e)
+        if stop.wait(ALERTS_REFRESH_INTERVAL):
+            return
+
+
+def _store_alerts(fetched_at: float, alerts: List[Dict[str, Any]]) -> None:
+    """Replace the shared parsed feed"""
+    global _latest_alerts
+    with _latest_lock:
+        _latest_alerts = (fetched_at, alerts)
+
+
+def _fetch_alerts(api_key: str) -> List[Dict[str, Any]]:
+    """
+    Fetch the GTFS-RT feed and turn significant delays into alerts
+
+    Args:
+        api_key: STM API key
+
+    Returns:
+        Alerts for every delayed route (metro and bus)
+
+    Raises:
+        requests.exceptions.RequestException: If the feed can't be fetched
+    """
+    headers = {"apikey": api_key}
+
+    logger.debug("Fetching STM GTFS-RT data from %s", STM_ALERTS_URL)
+    response = http_session.get(STM_ALERTS_URL, headers=headers, timeout=10)
+    response.raise_for_status()
+
+    # Parse GTFS-RT protobuf data
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(response.content)
+    logger.debug("Parsed %d GTFS-RT entities", len(feed.entity))
+
+    # Extract delays from trip updates. Unset scalar fields read as their default
+    # ("" / 0), which the checks below skip, so no HasField call is needed
+    delays: Dict[str, List[int]] = {}  # route_id -> list of delays
+    delays_setdefault = delays.setdefault
+
+    for entity in feed.entity:
+        trip_update = entity.trip_update
+        route_id = trip_update.trip.route_id
+        if not route_id:
+            continue
+
+        # Only report significant delays (> 2 minutes) from stop_time_updates
+        for stop_update in trip_update.stop_time_update:
+            delay_seconds = stop_update.arrival.delay
+            if delay_seconds > 120 or delay_seconds < -120:
+                delays_setdefault(route_id, []).append(delay_seconds)
+
+    # Convert delays to alerts
+    alerts = []
+    for route_id, delay_list in delays.items():
+        # Determine route type
+        route_kind = "metro" if route_id in _METRO_ROUTE_IDS else "bus"
+
+        # Calculate average delay
+        avg_delay = sum(delay_list) / len(delay_list)
+        max_delay = max(delay_list)
+
+        # Create alert message
+        delay_minutes = int(avg_delay / 60)
+        max_delay_minutes = int(max_delay / 60)
+
+        if avg_delay > 0:
+            header = f"Delays on route {route_id}"
+            description = f"Average delay: {delay_minutes} minutes (max: {max_delay_minutes} minutes)"
+        else:
+            header = f"Route {route_id} running ahead of schedule"
+            description = f"Average: {abs(delay_minutes)} minutes early"
+
+        alert_info = {
+            "id": f"delay_{route_id}",
+            "header": header,
+            "description": description,
+            "cause": "UNKNOWN_CAUSE",
+            "effect": "SIGNIFICANT_DELAYS" if avg_delay > 0 else "OTHER_EFFECT",
+            "affected_routes": [route_id],
+            "route_types": [route_kind],
+            "avg_delay_seconds": int(avg_delay),
+            "max_delay_seconds": int(max_delay),
+            "num_delayed_stops": len(delay_list),
+        }
+        alerts.append(alert_info)
+
+    return alerts
@@ -0,0 +1,215 @@
+"""
+Argument validation for tool calls, compiled once from the tool schemas
+"""
+
+import logging
+import math
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from .definitions import TOOLS
+
+logger = logging.getLogger(__name__)
+
+# Returns a description of the first problem found, or None if the arguments are valid
+Validator = Callable[[Dict[str, Any]], Optional[str]]
+
+# (latitude, longitude) argument pairs of the tools that take coordinates
+_COORDINATE_ARGS: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "get_weather": (("latitude", "longitude"),),
+    "plan_trip": (("from_lat", "from_lon"), ("to_lat", "to_lon")),
+}
+
+
+def _is_number(value: Any) -> bool:
+    """Whether a value can be used as a number (numeric strings included)"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        return math.isfinite(float(value))
+    except (TypeError, ValueError):
+        return False
+
+
+# Checks for each JSON schema type used by the tool parameters
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "number": _is_number,
+    "string": lambda value: isinstance(value, str),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+}
+
+
+def _compile(parameters: Dict[str, Any]) -> Validator:
+    """
+    Build the validator of one tool from its parameters schema
+
+    Args:
+        parameters: JSON schema of the tool parameters
+
+    Returns:
+        Function checking required arguments, types and enum values
+    """
+    required: List[str] = parameters.get("required", [])
+    checks: List[Tuple[str, str, Callable[[Any], bool], Optional[List[Any]]]] = []
+    for name, spec in parameters.get("properties", {}).items():
+        type_check = _TYPE_CHECKS.get(spec.get("type"), lambda value: True)
+        checks.append((name, spec.get("type", "any"), type_check, spec.get("enum")))
+
+    # Arrays: type of their items and maximum length
+    items: Dict[str, Tuple[str, Callable[[Any], bool], Optional[int]]] = {}
+    for name, spec in parameters.get("properties", {}).items():
+        if spec.get("type") == "array":
+            item_type = spec.get("items", {}).get("type", "any")
+            item_check = _TYPE_CHECKS.get(item_type, lambda value: True)
+            items[name] = (item_type, item_check, spec.get("maxItems"))
+
+    enums_upper = {
+        name: frozenset(str(value).upper() for value in enum)
+        for name, _, _, enum in checks
+        if enum is not None
+    }
+
+    def validate(arguments: Dict[str, Any]) -> Optional[str]:
+        for name in required:
+            if name not in arguments:
+                return f"missing required argument '{name}'"
+        for name, type_name, type_check, enum in checks:
+            if name not in arguments:
+                continue
+            value = arguments[name]
+            if not type_check(value):
+                article = "an" if type_name[0] in "aeiou" else "a"
+                return f"'{name}' must be {article} {type_name}, got {value!r}"
+            # Enum values are matched case-insensitively, like the tools read them
+            if enum is not None and str(value).upper() not in enums_upper[name]:
+                return f"'{name}' must be one of {enum}, got {value!r}"
+            if name in items:
+                item_type, item_check, max_items = items[name]
+                if not value:
+                    return f"'{name}' must not be empty"
+                if max_items is not None and len(value) > max_items:
+                    return f"'{name}' must have at most {max_items} items, got {len(value)}"
+                for item in value:
+                    if not item_check(item):
+                        return f"'{name}' items must be {item_type}s, got {item!r}"
+        return None
+
+    return validate
+
+
+def _invalid_coordinates(tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    Check the coordinate arguments of a call before any request is made
+
+    Args:
+        tool_name: Name of the tool
+        arguments: Arguments of the call (types already checked)
+
+    Returns:
+        Description of the first invalid coordinate, or None if all are valid
+    """
+    for lat_name, lon_name in _COORDINATE_ARGS.get(tool_name, ()):
+        for name, limit in ((lat_name, 90.0), (lon_name, 180.0)):
+            if name not in arguments:
+                continue
+            value = float(arguments[name])
+            if not -limit <= value <= limit:
+                return f"{name} must be between {-limit:g} and {limit:g}, got {value:g}"
+    return None
+
+
+# Validators compiled once at import, keyed by tool name
+_VALIDATORS: Dict[str, Validator] = {
+    tool["function"]["name"]: _compile(tool["function"]["parameters"]) for tool in TOOLS
+}
+
+# Parameter names declared by each tool, keyed by tool name
+_ALLOWED_ARGUMENTS: Dict[str, FrozenSet[str]] = {
+    tool["function"]["name"]: frozenset(tool["function"]["parameters"].get("properties", {}))
+    for tool in TOOLS
+}
+
+
+def drop_unknown_arguments(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Remove the arguments a tool doesn't declare, so extra keys the model
+    makes up don't fail the call
+
+    Args:
+        tool_name: Name of the tool
+        arguments: Arguments of the call
+
+    Returns:
+        The arguments themselves if all are declared, otherwise a filtered copy
+    """
+    allowed = _ALLOWED_ARGUMENTS.get(tool_name)
+    if allowed is None or allowed.issuperset(arguments):
+        return arguments
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Ignoring unknown argument(s) for %s: %s",
+            tool_name,
+            sorted(set(arguments) - allowed),
+        )
+    return {name: value for name, value in arguments.items() if name in allowed}
+
+
+# Number-typed parameter names of each tool, keyed by tool name
+_NUMBER_ARGUMENTS: Dict[str, Tuple[str, ...]] = {
+    tool["function"]["name"]: tuple(
+        name
+        for name, spec in tool["function"]["parameters"].get("properties", {}).items()
+        if spec.get("type") == "number"
+    )
+    for tool in TOOLS
+}
+
+
+def coerce_numbers(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the numeric strings the model passes for number parameters
+    (e.g. "45.5") to numbers, so tools can compute with them
+
+    Args:
+        tool_name: Name of the tool
+        arguments: Validated arguments of the call
+
+    Returns:
+        The arguments themselves if no conversion is needed, otherwise a converted copy
+    """
+    strings = [
+        name
+        for name in _NUMBER_ARGUMENTS.get(tool_name, ())
+        if isinstance(arguments.get(name), str)
+    ]
+    if not strings:
+        return arguments
+    coerced = dict(arguments)
+    for name in strings:
+        value = coerced[name].strip()
+        try:
+            coerced[name] = int(value)
+        except ValueError:
+            coerced[name] = float(value)
+    return coerced
+
+
+def validate_arguments(tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+    """
+    Validate the arguments of a tool call against the tool's schema
+
+    Args:
+        tool_name: Name of the tool
+        arguments: Arguments of the call
+
+    Returns:
+        Description of the first problem found, or None if the arguments are valid
+    """
+    validator = _VALIDATORS.get(tool_name)
+    if validator is not None:
+        invalid = validator(arguments)
+        if invalid is not None:
+            return invalid
+    return _invalid_coordinates(tool_name, arguments)
@@ -4,10 +4,16 @@ Weather tool using Open-Meteo API
 
 import requests
 import logging
+import orjson
 from typing import Any, Dict
 
+from .http_client import http_session
+
 logger = logging.getLogger(__name__)
 
+# Open-Meteo API endpoint
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+
 
 def get_weather(latitude: float, longitude: float) -> Dict[str, Any]:
     """
@@ -20,10 +26,11 @@ def get_weather(latitude: float, longitude: float) -> Dict[str, Any]:
     Returns:
         Dictionary with weather information
     """
-    logger.debug(f"🌤️  Getting weather for location ({latitude}, {longitude})")
+    logger.debug("🌤️  Getting weather for location (%s, %s)", latitude, longitude)
     try:
-        # Open-Meteo API endpoint
-        url = "https://api.open-meteo.com/v1/forecast"
+        # Coordinates rounded to ~1 km like the cache key, so a cached result
+        # (location included) is what the request would have returned
+        latitude, longitude = round(float(latitude), 2), round(float(longitude), 2)
 
         # Request parameters
         params = {
@@ -34,10 +41,10 @@ def get_weather(latitude: float, longitude: float) -> Dict[str, Any]:
         }
 
         logger.debug("Fetching weather from Open-Meteo API")
-        response = requests.get(url, params=params, timeout=10)
+        response = http_session.get(WEATHER_URL, params=params, timeout=5)
         response.raise_for_status()
 
-        data = response.json()
+        data = orjson.loads(response.content)
 
         # Extract current weather
         current = data.get("current", {})
@@ -60,14 +67,14 @@ def get_weather(latitude: float, longitude: float) -> Dict[str, Any]:
         }
 
         logger.debug(
-            f"✅ Weather: {result['temperature']}°C, feels like {result['feels_like']}°C"
+            "✅ Weather: %s°C, feels like %s°C", result["temperature"], result["feels_like"]
         )
 
         return result
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"❌ Failed to fetch weather data: {str(e)}")
+        logger.error("❌ Failed to fetch weather data: %s", e)
         return {"error": f"Failed to fetch weather data: {str(e)}"}
     except Exception as e:
-        logger.error(f"❌ Unexpected error in get_weather: {str(e)}", exc_info=True)
+        logger.error("❌ Unexpected error in get_weather: %s", e, exc_info=True)
         return {"error": f"Unexpected error: {str(e)}"}
@@ -2,10 +2,11 @@
 API client for communicating with MTL Finder backend.
 """
 
+import json
 import requests
 import time
 import uuid
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, Iterator, List, Any
 from dataclasses import dataclass
 
 from config import (
@@ -20,7 +21,7 @@ from config import (
 
 @dataclass
 class ChatResponse:
-    """Response from the chat API."""
+    """Response from the chat API (messages added during this turn)."""
 
     success: bool
     messages: List[Dict[str, str]]
@@ -130,60 +131,64 @@ class APIClient:
             pass
 
         # Fallback to local UUID
-        return str(uuid.uuid4())
+        return uuid.uuid4().hex
 
-    def send_chat_message(
+    def stream_chat_message(
         self,
         content: str,
         session_id: str,
+        response: ChatResponse,
         user_location: Optional[Dict[str, float]] = None,
-    ) -> ChatResponse:
+    ) -> Iterator[str]:
         """
-        Send a chat message to the backend.
+        Send a chat message to the backend and stream the assistant's reply.
 
         Args:
             content: User's message content
             session_id: Current session ID
+            response: ChatResponse filled in once the stream ends
             user_location: Optional user location dict with latitude/longitude
 
-        Returns:
-            ChatResponse with success status and messages or error
+        Yields:
+            Chunks of the assistant's reply as they are generated
         """
-        try:
-            # Prepare payload
-            payload = {
-                "content": content,
-                "session_id": session_id,
-            }
-
-            # Add user location if provided
-            if user_location:
-                payload["user_location"] = user_location
+        payload: Dict[str, Any] = {
+            "content": content,
+            "session_id": session_id,
+        }
+        if user_location:
+            payload["user_location"] = user_location
 
-            # Send request
-            response = self._make_request("POST", "/chat", json_data=payload)
-
-            if response.status_code == 200:
-                data = response.json()
-                return ChatResponse(
-                    success=True,
-                    messages=data.get("messages", []),
-                )
-            else:
-                error_msg = ERROR_API_STATUS.format(status=response.status_code)
-                return ChatResponse(
-                    success=False,
-                    messages=[],
-                    error=error_msg,
-                )
+        try:
+            with requests.post(
+                f"{self.base_url}/chat/stream",
+                json=payload,
+                timeout=self.timeout,
+                stream=True,
+            ) as http_response:
+                if http_response.status_code != 200:
+                    response.error = ERROR_API_STATUS.format(
+                        status=http_response.status_code
+                    )
+                    return
+
+                # Server-Sent Events: "event: <name>" and "data: <json>" lines, blank line ends an event
+                event = None
+                for line in http_response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[7:]
+                    elif line.startswith("data: "):
+                        data = json.loads(line[6:])
+                        if event == "delta":
+                            yield data["content"]
+                        elif event == "done":
+                            response.success = True
+                            response.messages = data.get("new_messages", [])
+                        elif event == "error":
+                            response.error = data.get("detail")
 
         except requests.exceptions.RequestException as e:
-            error_msg = ERROR_API_CONNECTION.format(error=str(e))
-            return ChatResponse(
-                success=False,
-                messages=[],
-                error=error_msg,
-            )
+            response.error = ERROR_API_CONNECTION.format(error=str(e))
 
     def health_check(self) -> bool:
         """
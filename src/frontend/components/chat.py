@@ -7,7 +7,7 @@ from typing import Optional
 
 from config import CHAT_INPUT_PLACEHOLDER, THINKING_MESSAGE
 from state import SessionState
-from api_client import APIClient
+from api_client import APIClient, ChatResponse
 
 
 def render_chat_messages() -> None:
@@ -51,35 +51,38 @@ def process_api_response(prompt: str, api_client: APIClient) -> None:
         prompt: The user's message content
         api_client: APIClient instance for backend communication
     """
-    # Show spinner while processing
-    with st.spinner(THINKING_MESSAGE):
-        # Get user location if available
-        user_location = None
-        if SessionState.has_location():
-            loc = SessionState.get_user_location()
-            if loc:
-                user_location = loc.to_dict()
-
-        # Send message to API
-        response = api_client.send_chat_message(
-            content=prompt,
-            session_id=SessionState.get_session_id() or "",
-            user_location=user_location,
+    # Get user location if available
+    user_location = None
+    if SessionState.has_location():
+        loc = SessionState.get_user_location()
+        if loc:
+            user_location = loc.to_dict()
+
+    # Stream the reply from the API as it is generated
+    response = ChatResponse(success=False, messages=[])
+    with st.chat_message("assistant"), st.spinner(THINKING_MESSAGE):
+        st.write_stream(
+            api_client.stream_chat_message(
+                content=prompt,
+                session_id=SessionState.get_session_id() or "",
+                response=response,
+                user_location=user_location,
+            )
         )
 
-        if response.success:
-            # Get the assistant's response
-            assistant_message = response.get_last_assistant_message()
-            if assistant_message:
-                SessionState.add_message("assistant", assistant_message)
-            else:
-                error_msg = "No response received from assistant"
-                SessionState.add_message("assistant", error_msg, message_type="error")
+    if response.success:
+        # Get the assistant's response
+        assistant_message = response.get_last_assistant_message()
+        if assistant_message:
+            SessionState.add_message("assistant", assistant_message)
         else:
-            # Add error message
-            SessionState.add_message(
-                "assistant", response.error or "Unknown error", message_type="error"
-            )
+            error_msg = "No response received from assistant"
+            SessionState.add_message("assistant", error_msg, message_type="error")
+    else:
+        # Add error message
+        SessionState.add_message(
+            "assistant", response.error or "Unknown error", message_type="error"
+        )
 
     # Update last processed index
     SessionState.set_last_processed_idx(SessionState.get_message_count() - 1)
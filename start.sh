@@ -97,14 +97,29 @@ echo "Step 3: Starting Backend API"
 echo "============================="
 echo ""
 
+# Start Redis session store (only when configured)
+if [ -n "${REDIS_URL}" ]; then
+    docker compose -f docker-compose.redis.yml up -d
+    echo "✓ Redis session store started"
+    echo ""
+fi
+
+# Several workers need shared state (sessions, locks, tool cache) in Redis
+API_WORKERS=${API_WORKERS:-1}
+if [ "${API_WORKERS}" -gt 1 ] && [ -z "${REDIS_URL}" ]; then
+    echo "Error: API_WORKERS=${API_WORKERS} requires REDIS_URL to be set."
+    echo "Sessions are kept in each worker's memory otherwise."
+    exit 1
+fi
+
 # Start backend in background
 cd src/backend
-uv run uvicorn main:app --host 0.0.0.0 --port ${API_PORT} > ../../backend.log 2>&1 &
+uv run uvicorn main:app --host 0.0.0.0 --port ${API_PORT} --workers ${API_WORKERS} > ../../backend.log 2>&1 &
 BACKEND_PID=$!
 echo $BACKEND_PID > ../../backend.pid
 cd ../..
 
-echo "✓ Backend started (PID: $BACKEND_PID)"
+echo "✓ Backend started (PID: $BACKEND_PID, ${API_WORKERS} worker(s))"
 echo "  Logs: tail -f backend.log"
 echo "  API: ${API_URL}"
 echo ""
@@ -141,6 +156,9 @@ echo ""
 echo "Logs:"
 echo "  - Photon:   docker logs -f photon-geocoder"
 echo "  - OTP:      docker logs -f otp-montreal"
+if [ -n "${REDIS_URL}" ]; then
+    echo "  - Redis:    docker logs -f mtl-redis"
+fi
 echo "  - Backend:  tail -f backend.log"
 echo "  - Frontend: tail -f frontend.log"
 echo ""
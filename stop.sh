@@ -54,6 +54,16 @@ else
 fi
 echo ""
 
+# Stop Redis
+if docker ps | grep -q mtl-redis; then
+    echo "Stopping Redis..."
+    docker compose -f docker-compose.redis.yml down
+    echo "✓ Redis stopped"
+else
+    echo "Redis not running"
+fi
+echo ""
+
 # Stop Photon
 if docker ps | grep -q photon-geocoder; then
     echo "Stopping Photon Geocoder..."